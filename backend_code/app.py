@@ -19,13 +19,13 @@ from flask_cors import CORS
 # Import local modules with fallback for Vercel
 try:
     from auth import get_auth_url, get_access_token, make_graph_request
-    from enhanced_email_warmup import EnhancedEmailWarmupService
+    from enhanced_email_warmup import EnhancedEmailWarmupService, start_log_listener
     from database import DatabaseManager
     from background_service import BackgroundWarmupService
     from config import Config
 except ImportError:
     from backend_code.auth import get_auth_url, get_access_token, make_graph_request
-    from backend_code.enhanced_email_warmup import EnhancedEmailWarmupService
+    from backend_code.enhanced_email_warmup import EnhancedEmailWarmupService, start_log_listener
     from backend_code.database import DatabaseManager
     from backend_code.background_service import BackgroundWarmupService
     from backend_code.config import Config
@@ -591,7 +591,7 @@ try:
     
     db_manager = DatabaseManager(Config.MONGO_URL, Config.DATABASE_NAME)
     warmup_service = EnhancedEmailWarmupService(db_manager) if db_manager.db is not None else None
-    # background_service = BackgroundWarmupService()
+    # background_service = BackgroundWarmupService(db_manager, warmup_service)
     
     # Start background service
     # background_service.start()
@@ -961,6 +961,8 @@ def oauth_callback():
                 
                 if mailbox_result.get('success'):
                     print(f"✅ Mailbox saved to linkbox_box_table: {mailbox_result.get('mailbox_id')}")
+                    if warmup_service:
+                        warmup_service.notify_refresh()
                     print(f"  - Access token: Saved to linkbox_box_table ONLY (NOT in session)")
                     print(f"  - User profile: Saved to linkbox_box_table ONLY (NOT in session)")
                     print(f"  - User ID: {user_id}")
@@ -1020,6 +1022,8 @@ def oauth_callback():
                     )
                     if mailbox_result.get('success'):
                         print(f"✅ Automatically added mailbox to linkbox_box_table: {mailbox_result.get('mailbox_id')}")
+                        if warmup_service:
+                            warmup_service.notify_refresh()
                     else:
                         print(f"⚠️  Failed to add mailbox to linkbox_box_table: {mailbox_result.get('error')}")
                 else:
@@ -2650,7 +2654,7 @@ def check_bounces(campaign_id):
                     print(f"Found potential bounce message: {subject} (indicators: {indicator_count}, system sender: {is_system_sender})")
                     
                     # Get full message body for comprehensive email extraction
-                    full_message = make_graph_request(f"/me/messages/{message_id}", access_token, 'GET')
+                    full_message = make_graph_request(f"/me/messages/{message_id}?$select=body", access_token, 'GET')
                     body_text = ''
                     if isinstance(full_message, dict):
                         body_content = full_message.get('body', {})
@@ -2868,6 +2872,7 @@ def sync_clerk_user():
                     }
                 }
             )
+            db_manager.invalidate_user_cache(clerk_user_id=clerk_user_id)
             user_id = str(existing_user.get('user_id'))  # Convert ObjectId to string
             print(f"✓ Updated Clerk user: {clerk_user_id} ({email})")
         else:
@@ -2923,36 +2928,33 @@ def sync_clerk_user():
         if db_manager and db_manager.mailboxes_collection is not None:
             try:
                 from bson import ObjectId
+                from pymongo.write_concern import WriteConcern
                 user_id_obj = ObjectId(user_id)
                 
-                # Find primary mailbox for this user
-                primary_mailbox = db_manager.mailboxes_collection.find_one({
-                    'user_id': user_id_obj,
-                    'is_primary': True,
-                    'is_active': True
-                })
+                # Primary mailbox for this user, or else its oldest active one, in one query
+                primary_mailbox = db_manager.mailboxes_collection.find_one(
+                    {'user_id': user_id_obj, 'is_active': True},
+                    sort=[('is_primary', -1), ('created_at', 1)]
+                )
                 
-                # If no primary mailbox, get any active mailbox and set it as primary
-                if not primary_mailbox:
-                    primary_mailbox = db_manager.mailboxes_collection.find_one({
-                        'user_id': user_id_obj,
-                        'is_active': True
-                    })
-                    
-                    if primary_mailbox:
-                        # Set this mailbox as primary
-                        db_manager.mailboxes_collection.update_one(
-                            {'_id': primary_mailbox['_id']},
-                            {'$set': {'is_primary': True, 'updated_at': datetime.now(timezone.utc)}}
-                        )
-                        print(f"Auto-set first mailbox as primary: {primary_mailbox.get('email')}")
+                # If there was no primary mailbox, set the one found as primary
+                if primary_mailbox and not primary_mailbox.get('is_primary'):
+                    now = datetime.now(timezone.utc)
+                    # A flag flip: acknowledged by the primary, no journal wait
+                    db_manager.mailboxes_collection.with_options(
+                        write_concern=WriteConcern(w=1, j=False)
+                    ).update_one(
+                        {'_id': primary_mailbox['_id']},
+                        {'$set': {'is_primary': True, 'updated_at': now}}
+                    )
+                    print(f"Auto-set first mailbox as primary: {primary_mailbox.get('email')}")
                 
                 # Load primary mailbox credentials into session
                 if primary_mailbox:
                     session['access_token'] = primary_mailbox.get('access_token')
                     session['user_profile'] = primary_mailbox.get('user_profile')
                     session['user_email'] = primary_mailbox.get('email')
-                    session['mailbox_id'] = str(primary_mailbox['_id'])
+                    session['mailbox_id'] = primary_mailbox['_id'].binary.hex()  # same text as str(ObjectId)
                     print(f"✓ Auto-loaded primary mailbox into session: {primary_mailbox.get('email')}")
                 else:
                     print(f"ℹ No mailboxes found for user {clerk_user_id}")
@@ -4037,6 +4039,35 @@ def stop_campaign(campaign_id):
 
 print("✅ Stop campaign endpoint registered at /api/campaigns/<campaign_id>/stop")
 
+@main_bp.route('/__test_batch', methods=['POST'])
+def test_batch():
+    """Run several requests against this app in one call (used by test_api.py)
+    
+    Only enabled with ENABLE_TEST_BATCH. Sub-requests go through a fresh test
+    client, so they carry no session of the caller.
+    """
+    if not Config.ENABLE_TEST_BATCH:
+        return jsonify({'error': 'Not found'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    results = []
+    with app.test_client() as client:
+        for item in data.get('pipeline', []):
+            response = client.open(
+                item.get('path', '/'),
+                method=item.get('method', 'GET'),
+                json=item.get('body'),
+                follow_redirects=False
+            )
+            # Binary bodies (e.g. the tracking pixel) are left out; the caller only reads text/JSON
+            is_text = response.is_json or response.mimetype.startswith('text/')
+            results.append({
+                'status': response.status_code,
+                'headers': dict(response.headers),
+                'body': response.get_data().decode('utf-8', errors='replace') if is_text else ''
+            })
+    return jsonify(results)
+
 # Register blueprint
 app.register_blueprint(main_bp)
 
@@ -4059,4 +4090,9 @@ if __name__ == "__main__":
     import sys
     use_reloader = sys.platform != 'win32'
     
-    app.run(debug=True, host='0.0.0.0', port=Config.PORT, use_reloader=use_reloader)
\ No newline at end of file
+    # Warmup logs go to the root handlers through a background listener
+    warmup_log_listener = start_log_listener()
+    try:
+        app.run(debug=True, host='0.0.0.0', port=Config.PORT, use_reloader=use_reloader)
+    finally:
+        warmup_log_listener.stop()
\ No newline at end of file
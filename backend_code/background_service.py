@@ -7,9 +7,11 @@ from database import DatabaseManager
 from config import Config
 
 class BackgroundWarmupService:
-    def __init__(self):
-        self.db_manager = DatabaseManager(Config.MONGO_URL, Config.DATABASE_NAME)
-        self.warmup_service = EnhancedEmailWarmupService(self.db_manager)
+    def __init__(self, db_manager: DatabaseManager = None, warmup_service: EnhancedEmailWarmupService = None):
+        # Reuse the app's manager (and its pooled client) when one is passed in
+        self.db_manager = db_manager or DatabaseManager(Config.MONGO_URL, Config.DATABASE_NAME)
+        # Sharing the app's warmup service lets its notify_refresh() wake this loop
+        self.warmup_service = warmup_service or EnhancedEmailWarmupService(self.db_manager)
         self.running = False
         self.thread = None
     
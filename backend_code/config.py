@@ -18,6 +18,8 @@ class Config:
     MAX_DELAY_BETWEEN_EMAILS = int(os.getenv("MAX_DELAY_BETWEEN_EMAILS", 100))
     AUTHORITY = "https://login.microsoftonline.com/common"
     GRAPH_ENDPOINT = "https://graph.microsoft.com/v1.0"
+    # Exposes /__test_batch for test_api.py; keep off outside local testing
+    ENABLE_TEST_BATCH = os.getenv("ENABLE_TEST_BATCH", "false").lower() == "true"
     USER_SCOPES = [
     "openid",
     "profile",
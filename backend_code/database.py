@@ -1,9 +1,14 @@
 # database.py
-from pymongo import MongoClient
 from datetime import datetime, timezone
 from typing import Dict, List, Optional
 import logging
 from werkzeug.security import generate_password_hash, check_password_hash
+from mongo_client import get_client
+
+# Name of the (user_id, created_at desc) index used to list a user's latest campaigns
+CAMPAIGNS_USER_RECENT_INDEX = 'user_recent'
+# Name of the partial unique index allowing at most one active primary mailbox per user
+MAILBOXES_ONE_PRIMARY_INDEX = 'user_one_primary'
 
 class DatabaseManager:
     def __init__(self, connection_string: str, database_name: str):
@@ -22,22 +27,11 @@ class DatabaseManager:
         self.warmup_emails_collection = None
         
         try:
-            # Add connection options for better reliability
-            connection_options = {
-                'serverSelectionTimeoutMS': 10000,  # 10 second timeout
-                'connectTimeoutMS': 10000,
-                'socketTimeoutMS': 10000,
-                'retryWrites': True,
-                'retryReads': True,
-                'maxPoolSize': 10,
-                'minPoolSize': 1,
-            }
-            
-            # Try to connect with options
+            # Share the process-wide client (and its connection pool)
             if not connection_string:
                 raise ValueError("MongoDB connection string is not provided")
             
-            self.client = MongoClient(connection_string, **connection_options)
+            self.client = get_client(connection_string)
             # Test connection
             self.client.admin.command('ping')
             self.db = self.client[database_name]
@@ -63,54 +57,77 @@ class DatabaseManager:
             self.warmup_emails_collection = self.db['warm_up_emails_table']
             
             # ==================== CREATE INDEXES ====================
-            try:
-                # User Information Table indexes
-                self.users_collection.create_index("login_id", unique=True, sparse=True)
-                self.users_collection.create_index("email", unique=True, sparse=True)
-                self.users_collection.create_index("clerk_user_id", unique=True, sparse=True)
-                self.users_collection.create_index("is_active")
-                
-                # Mailboxes Table indexes
-                self.mailboxes_collection.create_index("user_id")
-                self.mailboxes_collection.create_index("email")
-                self.mailboxes_collection.create_index([("user_id", 1), ("email", 1)], unique=True)
-                self.mailboxes_collection.create_index("is_primary")
-                self.mailboxes_collection.create_index("is_active")
-                
-                # Campaign Creation Table indexes
-                self.campaigns_collection.create_index("campaign_id", unique=True)
-                self.campaigns_collection.create_index("user_id")
-                self.campaigns_collection.create_index("mailbox_id")
-                self.campaigns_collection.create_index("status")
-                self.campaigns_collection.create_index("start_time")
-                self.campaigns_collection.create_index([("user_id", 1), ("status", 1)])
-                
-                # Campaign Matrix Table indexes
-                self.campaign_metrics_collection.create_index("campaign_id", unique=True)
-                self.campaign_metrics_collection.create_index("user_id")
-                self.campaign_metrics_collection.create_index("mailbox_id")
-                self.campaign_metrics_collection.create_index([("campaign_id", 1), ("user_id", 1)])
-                
-                # Email Tracking Table indexes
-                self.email_tracking_collection.create_index("tracking_id", unique=True)
-                self.email_tracking_collection.create_index("campaign_id")
-                self.email_tracking_collection.create_index("user_id")
-                self.email_tracking_collection.create_index("recipient_email")
-                self.email_tracking_collection.create_index("sent_at")
-                
-                # Legacy indexes (for backward compatibility)
-                self.warmup_emails_collection.create_index("email", unique=True)
-                self.warmup_emails_collection.create_index("is_active")
-                
-                self.logger.info("✓ Database indexes created successfully")
-            except Exception as e:
-                self.logger.warning(f"Some indexes may not have been created: {e}")
+            self.ensure_indexes()
                 
         except Exception as e:
             self.logger.error(f"Failed to connect to MongoDB: {e}")
             self.logger.warning("Application will continue but database operations may fail")
             # Collections remain None - will be checked before use
     
+    def ensure_indexes(self):
+        """Create the indexes backing the hot lookups (idempotent)"""
+        try:
+            # User Information Table indexes
+            self.users_collection.create_index("login_id", unique=True, sparse=True)
+            self.users_collection.create_index("email", unique=True, sparse=True)
+            self.users_collection.create_index("clerk_user_id", unique=True, sparse=True)
+            self.users_collection.create_index("is_active")
+            # _id is included so existence checks by clerk_user_id are covered by the index
+            self.users_collection.create_index([("clerk_user_id", 1), ("is_active", 1), ("_id", 1)])
+            self.users_collection.create_index([("login_id", 1), ("is_active", 1)])
+
+            # Mailboxes Table indexes
+            self.mailboxes_collection.create_index("user_id")
+            self.mailboxes_collection.create_index("email")
+            self.mailboxes_collection.create_index([("user_id", 1), ("email", 1)], unique=True)
+            self.mailboxes_collection.create_index("is_primary")
+            self.mailboxes_collection.create_index("is_active")
+            # Primary-or-oldest active mailbox lookup on login walks this index in sort order;
+            # it also serves plain (user_id, is_active, is_primary) lookups
+            self.mailboxes_collection.create_index([("user_id", 1), ("is_active", 1), ("is_primary", -1), ("created_at", 1)])
+
+            # Campaign Creation Table indexes
+            self.campaigns_collection.create_index("campaign_id", unique=True)
+            self.campaigns_collection.create_index("user_id")
+            self.campaigns_collection.create_index("mailbox_id")
+            self.campaigns_collection.create_index("status")
+            self.campaigns_collection.create_index("start_time")
+            self.campaigns_collection.create_index([("user_id", 1), ("status", 1)])
+            self.campaigns_collection.create_index([("user_id", 1), ("created_at", -1)], name=CAMPAIGNS_USER_RECENT_INDEX)
+
+            # Campaign Matrix Table indexes
+            self.campaign_metrics_collection.create_index("campaign_id", unique=True)
+            self.campaign_metrics_collection.create_index("user_id")
+            self.campaign_metrics_collection.create_index("mailbox_id")
+            self.campaign_metrics_collection.create_index([("campaign_id", 1), ("user_id", 1)])
+
+            # Email Tracking Table indexes
+            self.email_tracking_collection.create_index("tracking_id", unique=True)
+            self.email_tracking_collection.create_index("campaign_id")
+            self.email_tracking_collection.create_index("user_id")
+            self.email_tracking_collection.create_index("recipient_email")
+            self.email_tracking_collection.create_index("sent_at")
+
+            # Legacy indexes (for backward compatibility)
+            self.warmup_emails_collection.create_index("email", unique=True)
+            self.warmup_emails_collection.create_index("is_active")
+
+            self.logger.info("✓ Database indexes created successfully")
+        except Exception as e:
+            self.logger.warning(f"Some indexes may not have been created: {e}")
+        
+        # Built on its own: it fails on data that already has two active primaries for a user,
+        # which must not stop the indexes above
+        try:
+            self.mailboxes_collection.create_index(
+                [("user_id", 1)],
+                name=MAILBOXES_ONE_PRIMARY_INDEX,
+                unique=True,
+                partialFilterExpression={'is_primary': True, 'is_active': True}
+            )
+        except Exception as e:
+            self.logger.warning(f"One-primary-per-user mailbox index was not created: {e}")
+    
     def save_user_tokens(self, email: str, access_token: str, user_profile: Dict, 
                         user_type: str = 'sender', is_new_account: bool = False, 
                         owner_email: str = None, owner_clerk_id: str = None) -> bool:
@@ -250,6 +267,20 @@ class DatabaseManager:
             self.logger.error(f"Error updating last used for {email}: {e}")
             return False
     
+    def bulk_update_last_used(self, emails: List[str]) -> int:
+        """Update last used timestamp for several users in one write"""
+        if self.db is None or self.warmup_emails_collection is None or not emails:
+            return 0
+        try:
+            result = self.warmup_emails_collection.update_many(
+                {'email': {'$in': list(emails)}},
+                {'$set': {'last_used': datetime.now(timezone.utc)}}
+            )
+            return result.modified_count
+        except Exception as e:
+            self.logger.error(f"Error updating last used for {len(emails)} users: {e}")
+            return 0
+    
     def save_warmup_campaign_log(self, campaign_data: Dict) -> bool:
         """Save warmup campaign execution log"""
         if self.db is None:
@@ -378,6 +409,12 @@ class DatabaseManager:
     def get_user_by_clerk_id(self, *args, **kwargs):
         return self._init_methods().get_user_by_clerk_id(*args, **kwargs)
     
+    def user_exists_by_clerk_id(self, *args, **kwargs):
+        return self._init_methods().user_exists_by_clerk_id(*args, **kwargs)
+    
+    def invalidate_user_cache(self, *args, **kwargs):
+        return self._init_methods().invalidate_user_cache(*args, **kwargs)
+    
     def create_mailbox(self, *args, **kwargs):
         return self._init_methods().create_mailbox(*args, **kwargs)
     
@@ -390,9 +427,15 @@ class DatabaseManager:
     def create_campaign(self, *args, **kwargs):
         return self._init_methods().create_campaign(*args, **kwargs)
     
+    def create_campaigns_bulk(self, *args, **kwargs):
+        return self._init_methods().create_campaigns_bulk(*args, **kwargs)
+    
     def get_campaigns_by_user_id(self, *args, **kwargs):
         return self._init_methods().get_campaigns_by_user_id(*args, **kwargs)
     
+    def get_campaigns_with_metrics(self, *args, **kwargs):
+        return self._init_methods().get_campaigns_with_metrics(*args, **kwargs)
+    
     def get_campaign_by_id(self, *args, **kwargs):
         return self._init_methods().get_campaign_by_id(*args, **kwargs)
     
@@ -402,6 +445,12 @@ class DatabaseManager:
     def update_campaign_metrics(self, *args, **kwargs):
         return self._init_methods().update_campaign_metrics(*args, **kwargs)
     
+    def increment_campaign_metrics(self, *args, **kwargs):
+        return self._init_methods().increment_campaign_metrics(*args, **kwargs)
+    
+    def increment_campaign_metrics_bulk(self, *args, **kwargs):
+        return self._init_methods().increment_campaign_metrics_bulk(*args, **kwargs)
+    
     def get_campaign_metrics(self, *args, **kwargs):
         return self._init_methods().get_campaign_metrics(*args, **kwargs)
     
@@ -1,9 +1,239 @@
 # Additional database methods for new schema
-from pymongo import MongoClient
+from pymongo import InsertOne, MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 from bson import ObjectId
+from bson.codec_options import TypeDecoder, TypeRegistry
+from threading import Lock
 import logging
+import time
+import uuid
+
+from database import MAILBOXES_ONE_PRIMARY_INDEX
+
+# How long a user lookup may be served from the in-process cache
+USER_CACHE_TTL_SECONDS = 60
+USER_CACHE_MAX_SIZE = 10000
+
+# Cursor batch size used when list methods are asked to stream their results
+STREAM_BATCH_SIZE = 200
+
+# Maximum number of operations sent in a single bulk_write call
+BULK_WRITE_CHUNK_SIZE = 1000
+
+# campaign_matrix documents keep counters packed under 'c' and rates under 'r'
+# with one-letter keys; these map the public field names to the stored keys
+METRIC_COUNTER_KEYS = {
+    'total_sent': 's',
+    'total_delivered': 'd',
+    'total_opened': 'o',
+    'total_clicks': 'k',
+    'total_bounced': 'b',
+    'total_replied': 'r',
+    'total_unsubscribed': 'u'
+}
+METRIC_RATE_KEYS = {
+    'open_rate': 'o',
+    'click_rate': 'c',
+    'bounce_rate': 'b',
+    'reply_rate': 'r'
+}
+
+# Projections reused on every call (pymongo does not mutate them)
+_ID_ONLY_PROJECTION = {'_id': 1}
+_USER_ACTIVE_PROJECTION = {'password': 0}
+_MAILBOX_LIST_PROJECTION = {'password': 0, 'access_token': 0, 'refresh_token': 0}
+_CAMPAIGN_LIST_PROJECTION = {'_id': 0, 'message': 0}
+_CAMPAIGN_WITH_BODY_PROJECTION = {'_id': 0}
+_METRICS_LIST_PROJECTION = {
+    '_id': 0,
+    'campaign_id': 1, 'user_id': 1, 'mailbox_id': 1,
+    'c': 1, 'r': 1, 'last_updated': 1
+}
+
+# Campaign metric rates (percent of total_sent) and the counter each one is derived from
+METRIC_RATE_FIELDS = {
+    'open_rate': 'total_opened',
+    'click_rate': 'total_clicks',
+    'bounce_rate': 'total_bounced',
+    'reply_rate': 'total_replied'
+}
+
+
+def _to_object_id(value: Union[str, ObjectId]) -> ObjectId:
+    """Parse an id string into an ObjectId, passing through values that already are one"""
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+
+def _chunked(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _bulk_insert(collection, docs: List[Dict]) -> Tuple[List[Dict], List[str]]:
+    """Insert docs with chunked unordered bulk writes; returns (inserted docs, error messages)"""
+    inserted = []
+    errors = []
+    for chunk in _chunked(docs, BULK_WRITE_CHUNK_SIZE):
+        try:
+            collection.bulk_write([InsertOne(doc) for doc in chunk], ordered=False)
+            inserted.extend(chunk)
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            failed = {error['index'] for error in write_errors}
+            inserted.extend(doc for index, doc in enumerate(chunk) if index not in failed)
+            errors.extend(error.get('errmsg', '') for error in write_errors)
+    return inserted, errors
+
+
+def _campaign_document(user_oid: ObjectId, mailbox_oid: ObjectId, campaign_name: str,
+                       subject: str, message: str, duration: int, start_time: datetime,
+                       total_recipients: int, now: datetime) -> Dict:
+    """Build a new campaign_creation_table document"""
+    return {
+        'campaign_id': str(uuid.uuid4()),
+        'user_id': user_oid,
+        'mailbox_id': mailbox_oid,
+        'campaign_name': campaign_name,
+        'subject': subject,
+        'message': message,
+        'duration': duration,
+        'start_time': start_time,
+        'end_time': start_time + timedelta(hours=duration),
+        'status': 'scheduled' if start_time > now else 'active',
+        'total_recipients': total_recipients,
+        'created_at': now,
+        'updated_at': now,
+        'created_by': user_oid
+    }
+
+
+def _initial_metrics_document(campaign_id: str, user_oid: ObjectId, mailbox_oid: ObjectId,
+                              now: datetime) -> Dict:
+    """Build a zeroed campaign_matrix document"""
+    return {
+        'campaign_id': campaign_id,
+        'user_id': user_oid,
+        'mailbox_id': mailbox_oid,
+        'c': {key: 0 for key in METRIC_COUNTER_KEYS.values()},
+        'r': {key: 0 for key in METRIC_RATE_KEYS.values()},
+        'created_at': now,
+        'last_updated': now
+    }
+
+
+class ObjectIdAsStringDecoder(TypeDecoder):
+    """Decode every BSON ObjectId straight to its hex string while the document is read"""
+    bson_type = ObjectId
+    
+    def transform_bson(self, value):
+        return str(value)
+
+
+STRING_ID_TYPE_REGISTRY = TypeRegistry([ObjectIdAsStringDecoder()])
+
+
+def _string_id_view(collection):
+    """Read-only view of a collection whose ObjectIds come back as strings"""
+    if collection is None:
+        return None
+    codec_options = collection.codec_options.with_options(type_registry=STRING_ID_TYPE_REGISTRY)
+    return collection.with_options(codec_options=codec_options)
+
+
+def _iter_mailboxes(cursor) -> Iterator[Dict]:
+    for mailbox in cursor:
+        mailbox['mailbox_id'] = mailbox.pop('_id')
+        yield mailbox
+
+
+def _iter_campaigns(cursor) -> Iterator[Dict]:
+    for campaign in cursor:
+        campaign.setdefault('created_by', '')
+        yield campaign
+
+
+def _metric_path(field: str) -> str:
+    """Stored (packed) path for a public metrics field name; other fields are unchanged"""
+    if field in METRIC_COUNTER_KEYS:
+        return f"c.{METRIC_COUNTER_KEYS[field]}"
+    if field in METRIC_RATE_KEYS:
+        return f"r.{METRIC_RATE_KEYS[field]}"
+    return field
+
+
+def _unpack_metrics(metrics: Dict) -> Dict:
+    """Expand the packed 'c'/'r' subdocuments back to the public field names"""
+    counters = metrics.pop('c', None) or {}
+    rates = metrics.pop('r', None) or {}
+    for field, key in METRIC_COUNTER_KEYS.items():
+        metrics[field] = counters.get(key, 0)
+    for field, key in METRIC_RATE_KEYS.items():
+        metrics[field] = rates.get(key, 0)
+    return metrics
+
+
+def _metrics_rates_stage() -> Dict:
+    """Pipeline stage recomputing every rate from the stored counters"""
+    sent = f"${_metric_path('total_sent')}"
+    rates = {
+        _metric_path(rate): {'$cond': [
+            {'$gt': [sent, 0]},
+            {'$round': [{'$multiply': [{'$divide': [f'${_metric_path(total)}', sent]}, 100]}, 2]},
+            0
+        ]}
+        for rate, total in METRIC_RATE_FIELDS.items()
+    }
+    return {'$set': rates}
+
+
+def _metrics_increment_pipeline(deltas: Dict[str, int]) -> List[Dict]:
+    """Build an update pipeline that adds deltas to counters and recomputes rates atomically"""
+    counters = {}
+    for field, delta in deltas.items():
+        path = _metric_path(field)
+        counters[path] = {'$add': [{'$ifNull': [f'${path}', 0]}, delta]}
+    counters['last_updated'] = '$$NOW'
+    return [{'$set': counters}, _metrics_rates_stage()]
+
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after ttl seconds"""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = Lock()
+    
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            return value
+    
+    def set(self, key, value):
+        with self.lock:
+            if len(self.entries) >= self.maxsize and key not in self.entries:
+                # Drop expired entries first, then the oldest insertion if still full
+                now = time.monotonic()
+                for stale_key in [k for k, (exp, _) in self.entries.items() if exp < now]:
+                    del self.entries[stale_key]
+                if len(self.entries) >= self.maxsize:
+                    del self.entries[next(iter(self.entries))]
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+    
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
 
 class DatabaseMethods:
     """Additional methods for the new database schema"""
@@ -16,6 +246,43 @@ class DatabaseMethods:
         self.campaign_metrics_collection = db_manager.campaign_metrics_collection
         self.email_tracking_collection = db_manager.email_tracking_collection
         self.logger = db_manager.logger
+        
+        # List reads decode ids to strings during BSON decoding instead of
+        # converting them field by field afterwards
+        self._mailboxes_read = _string_id_view(self.mailboxes_collection)
+        self._campaigns_read = _string_id_view(self.campaigns_collection)
+        self._campaign_metrics_read = _string_id_view(self.campaign_metrics_collection)
+        
+        # Users are looked up on nearly every authenticated request
+        self._users_by_clerk_id = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+        self._users_by_id = TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+    
+    def _cache_user(self, user: Dict):
+        """Store a user dict in both lookup caches"""
+        if user.get('user_id'):
+            self._users_by_id.set(user['user_id'], user)
+        if user.get('clerk_user_id'):
+            self._users_by_clerk_id.set(user['clerk_user_id'], user)
+    
+    def _logged_stream(self, items: Iterator[Dict], action: str) -> Iterator[Dict]:
+        """Yield from a lazily-fetched cursor; an error mid-iteration is logged and ends the stream"""
+        try:
+            yield from items
+        except Exception as e:
+            self.logger.error(f"Error {action}: {e}")
+    
+    def invalidate_user_cache(self, clerk_user_id: str = None, user_id: str = None):
+        """Drop cached lookups for a user after it has been modified"""
+        if clerk_user_id:
+            cached = self._users_by_clerk_id.get(clerk_user_id)
+            if cached and not user_id:
+                user_id = cached.get('user_id')
+            self._users_by_clerk_id.pop(clerk_user_id)
+        if user_id:
+            cached = self._users_by_id.get(str(user_id))
+            if cached and cached.get('clerk_user_id'):
+                self._users_by_clerk_id.pop(cached['clerk_user_id'])
+            self._users_by_id.pop(str(user_id))
     
     # ==================== USER INFORMATION METHODS ====================
     
@@ -27,7 +294,8 @@ class DatabaseMethods:
         try:
             # CRITICAL: Check if user already exists by clerk_user_id
             # This ensures the same user_id is always used for the same Clerk user
-            if clerk_user_id:
+            # The index-only existence probe keeps the common "new user" path cheap
+            if clerk_user_id and self.user_exists_by_clerk_id(clerk_user_id):
                 existing_user = self.get_user_by_clerk_id(clerk_user_id)
                 if existing_user:
                     # User already exists - return existing user (preserves same user_id)
@@ -39,22 +307,21 @@ class DatabaseMethods:
                 existing_by_login = self.users_collection.find_one({
                     'login_id': login_id,
                     'is_active': True
-                })
+                }, projection=_USER_ACTIVE_PROJECTION)
                 if existing_by_login:
-                    existing_by_login['user_id'] = str(existing_by_login['_id'])
-                    existing_by_login.pop('_id', None)
-                    existing_by_login.pop('password', None)
+                    existing_by_login['user_id'] = str(existing_by_login.pop('_id'))
                     self.logger.info(f"User already exists (by login_id): {login_id} - User ID: {existing_by_login.get('user_id')}")
                     return {'success': True, 'user': existing_by_login}
             
             # User doesn't exist - create new user
+            now = datetime.now(timezone.utc)
             user_data = {
                 'user_name': user_name,
                 'login_id': login_id,
                 'email': email,
                 'clerk_user_id': clerk_user_id,
-                'created_at': datetime.now(timezone.utc),
-                'updated_at': datetime.now(timezone.utc),
+                'created_at': now,
+                'updated_at': now,
                 'is_active': True
             }
             
@@ -68,6 +335,7 @@ class DatabaseMethods:
                 user_data['user_id'] = str(result.inserted_id)
                 user_data.pop('password', None)
                 user_data.pop('_id', None)
+                self.invalidate_user_cache(clerk_user_id=clerk_user_id, user_id=user_data['user_id'])
                 self.logger.info(f"User created: {user_name} ({login_id}) - User ID: {user_data['user_id']}")
                 return {'success': True, 'user': user_data}
             else:
@@ -78,213 +346,168 @@ class DatabaseMethods:
             return {'success': False, 'error': str(e)}
     
     def get_user_by_id(self, user_id: str) -> Optional[Dict]:
-        """Get user by user_id"""
+        """Get user by user_id (served from a short-lived cache when possible)"""
         try:
-            user = self.users_collection.find_one({'_id': ObjectId(user_id), 'is_active': True})
+            cached = self._users_by_id.get(str(user_id))
+            if cached is not None:
+                return dict(cached)
+            user = self.users_collection.find_one({'_id': ObjectId(user_id), 'is_active': True},
+                                                  projection=_USER_ACTIVE_PROJECTION)
             if user:
-                user['user_id'] = str(user['_id'])
-                user.pop('_id', None)
-                user.pop('password', None)
+                user['user_id'] = str(user.pop('_id'))
+                self._cache_user(dict(user))
             return user
         except Exception as e:
             self.logger.error(f"Error getting user by ID: {e}")
             return None
     
     def get_user_by_clerk_id(self, clerk_user_id: str) -> Optional[Dict]:
-        """Get user by Clerk user ID"""
+        """Get user by Clerk user ID (served from a short-lived cache when possible)"""
         try:
+            cached = self._users_by_clerk_id.get(clerk_user_id)
+            if cached is not None:
+                return dict(cached)
             if self.users_collection is None:
                 self.logger.error("users_collection is None - database not connected")
                 return None
-            user = self.users_collection.find_one({'clerk_user_id': clerk_user_id, 'is_active': True})
+            user = self.users_collection.find_one({'clerk_user_id': clerk_user_id, 'is_active': True},
+                                                  projection=_USER_ACTIVE_PROJECTION)
             if user:
-                user['user_id'] = str(user['_id'])
-                user.pop('_id', None)
-                user.pop('password', None)
+                user['user_id'] = str(user.pop('_id'))
+                self._cache_user(dict(user))
             return user
         except Exception as e:
             self.logger.error(f"Error getting user by Clerk ID: {e}")
             return None
     
+    def user_exists_by_clerk_id(self, clerk_user_id: str) -> Optional[str]:
+        """Return the user_id of the active user with this Clerk ID, or None
+        
+        Only _id is projected, so the (clerk_user_id, is_active, _id) index
+        answers the query without fetching the user document.
+        """
+        try:
+            cached = self._users_by_clerk_id.get(clerk_user_id)
+            if cached is not None:
+                return cached.get('user_id')
+            if self.users_collection is None:
+                self.logger.error("users_collection is None - database not connected")
+                return None
+            user = self.users_collection.find_one(
+                {'clerk_user_id': clerk_user_id, 'is_active': True},
+                projection=_ID_ONLY_PROJECTION
+            )
+            return str(user['_id']) if user else None
+        except Exception as e:
+            self.logger.error(f"Error checking user by Clerk ID: {e}")
+            return None
+    
     # ==================== MAILBOX METHODS ====================
     
-    def create_mailbox(self, user_id: str, email: str, access_token: str, 
+    def create_mailbox(self, user_id: Union[str, ObjectId], email: str, access_token: str, 
                       password: str = None, provider: str = 'outlook',
                       user_profile: Dict = None, is_primary: bool = False,
                       refresh_token: str = None) -> Dict:
-        """Create a new mailbox in linkbox_box_table"""
+        """Create a new mailbox in linkbox_box_table
+        
+        The mailbox becomes primary whenever the user has no other active primary
+        mailbox, so is_primary=True never changes the outcome and is kept only for
+        existing callers.
+        """
         try:
             if self.mailboxes_collection is None:
                 self.logger.error("mailboxes_collection is None - database not connected")
                 return {'success': False, 'error': 'Database not available'}
             
+            user_oid = _to_object_id(user_id)
+            
             # Check if user exists
             user = self.get_user_by_id(user_id)
             if not user:
                 return {'success': False, 'error': 'User not found'}
             
-            # Check if mailbox already exists for this user (regardless of is_active status)
-            # This handles re-adding previously disconnected mailboxes
-            # Note: Multiple users CAN have the same email (different user_id), but same user cannot have duplicate emails
-            existing = self.mailboxes_collection.find_one({
-                'user_id': ObjectId(user_id),
-                'email': email
-            })
+            now = datetime.now(timezone.utc)
+            set_fields = {
+                'access_token': access_token,
+                'password': password,
+                'user_profile': user_profile or {},
+                'is_active': True,  # Reactivate if it was disconnected
+                'status': 'active'
+            }
+            if refresh_token:
+                set_fields['refresh_token'] = refresh_token
+            
+            # Immutable fields are only written when the mailbox is first created;
+            # the _id is generated here so the new id is known without another query.
+            # A new mailbox starts as non-primary and is promoted below.
+            new_oid = ObjectId()
+            set_on_insert = {
+                '_id': new_oid,
+                'user_id': user_oid,
+                'email': email,
+                'provider': provider,
+                'is_primary': False,
+                'created_at': now
+            }
+            update = {
+                '$set': set_fields,
+                '$setOnInsert': set_on_insert,
+                '$currentDate': {'updated_at': True, 'last_used': True}
+            }
             
-            if existing:
-                self.logger.info(f"Found existing mailbox for user {user_id} and email {email}, is_active: {existing.get('is_active', 'unknown')}")
-            
-            if existing:
-                # Check if there's already an active primary mailbox for this user
-                existing_primary = self.mailboxes_collection.find_one({
-                    'user_id': ObjectId(user_id),
-                    'is_active': True,
-                    'is_primary': True,
-                    '_id': {'$ne': existing['_id']}  # Exclude the current mailbox
-                })
-                
-                # Count active mailboxes (excluding the one we're reactivating)
-                active_mailbox_count = self.mailboxes_collection.count_documents({
-                    'user_id': ObjectId(user_id),
-                    'is_active': True,
-                    '_id': {'$ne': existing['_id']}
-                })
-                
-                # Only set as primary if:
-                # 1. There's no other active primary mailbox, AND
-                # 2. Either it was explicitly requested OR there are no other active mailboxes
-                should_be_primary = False
-                if not existing_primary:
-                    # No other primary exists, so set this as primary if:
-                    # - Explicitly requested, OR
-                    # - This is the only active mailbox (or will be after reactivation)
-                    should_be_primary = is_primary or (active_mailbox_count == 0)
-                
-                # Update existing mailbox (reactivate if it was disconnected)
-                mailbox_data = {
-                    'access_token': access_token,
-                    'password': password,
-                    'user_profile': user_profile,
-                    'is_active': True,  # Reactivate if it was disconnected
-                    'status': 'active',
-                    'is_primary': should_be_primary,  # Only set as primary if no other primary exists
-                    'updated_at': datetime.now(timezone.utc),
-                    'last_used': datetime.now(timezone.utc)
-                }
-                # Update refresh_token if provided
-                if refresh_token:
-                    mailbox_data['refresh_token'] = refresh_token
-                # Only update provider if it's not set
-                if provider and not existing.get('provider'):
-                    mailbox_data['provider'] = provider
-                
-                # If we're setting this as primary, unset primary on all other mailboxes
-                if should_be_primary:
-                    self.mailboxes_collection.update_many(
-                        {
-                            'user_id': ObjectId(user_id),
-                            'is_active': True,
-                            '_id': {'$ne': existing['_id']}
-                        },
-                        {
-                            '$set': {
-                                'is_primary': False,
-                                'updated_at': datetime.now(timezone.utc)
-                            }
-                        }
-                    )
-                    self.logger.info(f"Unset primary flag on other mailboxes for user {user_id}")
-                
-                result = self.mailboxes_collection.update_one(
-                    {'_id': existing['_id']},
-                    {'$set': mailbox_data}
+            # Create or reactivate in a single round-trip. Re-adding a previously
+            # disconnected mailbox (same user + email) updates the existing document.
+            try:
+                previous = self.mailboxes_collection.find_one_and_update(
+                    {'user_id': user_oid, 'email': email},
+                    update,
+                    projection={'_id': 1, 'is_active': 1},
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE
                 )
-                mailbox_id = str(existing['_id'])
-                if existing.get('is_active'):
-                    self.logger.info(f"Updated existing active mailbox {email} for user {user_id}, is_primary: {should_be_primary}")
-                else:
-                    self.logger.info(f"Reactivated previously disconnected mailbox {email} for user {user_id}, is_primary: {should_be_primary}")
-            else:
-                # Check if this is the first mailbox (set as primary)
-                mailbox_count = self.mailboxes_collection.count_documents({
-                    'user_id': ObjectId(user_id),
-                    'is_active': True
-                })
-                
-                # Check if there's already a primary mailbox
-                existing_primary = self.mailboxes_collection.find_one({
-                    'user_id': ObjectId(user_id),
-                    'is_active': True,
-                    'is_primary': True
-                })
-                
-                # Only set as primary if:
-                # 1. Explicitly requested, OR
-                # 2. This is the first active mailbox (no other active mailboxes exist)
-                # AND there's no existing primary
-                should_be_primary = False
-                if not existing_primary:
-                    should_be_primary = is_primary or (mailbox_count == 0)
-                
-                mailbox_data = {
-                    'user_id': ObjectId(user_id),
-                    'email': email,
-                    'access_token': access_token,
-                    'password': password,
-                    'provider': provider,
-                    'user_profile': user_profile or {},
-                    'is_primary': should_be_primary,
-                    'is_active': True,
-                    'status': 'active',
-                    'created_at': datetime.now(timezone.utc),
-                    'updated_at': datetime.now(timezone.utc),
-                    'last_used': datetime.now(timezone.utc)
-                }
-                # Add refresh_token if provided
-                if refresh_token:
-                    mailbox_data['refresh_token'] = refresh_token
-                
-                # If we're setting this as primary, unset primary on all other mailboxes
-                if should_be_primary:
-                    self.mailboxes_collection.update_many(
-                        {
-                            'user_id': ObjectId(user_id),
-                            'is_active': True
-                        },
-                        {
-                            '$set': {
-                                'is_primary': False,
-                                'updated_at': datetime.now(timezone.utc)
-                            }
-                        }
-                    )
-                    self.logger.info(f"Unset primary flag on other mailboxes before creating new primary for user {user_id}")
-                
+            except DuplicateKeyError as e:
+                if MAILBOXES_ONE_PRIMARY_INDEX not in str(e):
+                    raise
+                # A disconnected mailbox that was primary is coming back while another
+                # mailbox is primary: reactivate it as non-primary (the document exists,
+                # so the insert-only copy of the flag is dropped to avoid a path conflict)
+                set_on_insert.pop('is_primary')
+                set_fields['is_primary'] = False
+                previous = self.mailboxes_collection.find_one_and_update(
+                    {'user_id': user_oid, 'email': email},
+                    update,
+                    projection={'_id': 1, 'is_active': 1},
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE
+                )
+            mailbox_oid = new_oid if previous is None else previous['_id']
+            
+            # Make this mailbox primary unless another active one already is. The
+            # one-primary index makes the promotion atomic: if a concurrent request
+            # promoted another mailbox first, this update fails with a duplicate key
+            # and the other mailbox stays primary.
+            other_primary = self.mailboxes_collection.find_one(
+                {'user_id': user_oid, 'is_active': True, 'is_primary': True, '_id': {'$ne': mailbox_oid}},
+                projection={'_id': 1}
+            )
+            is_now_primary = False
+            if other_primary is None:
                 try:
-                    result = self.mailboxes_collection.insert_one(mailbox_data)
-                    mailbox_id = str(result.inserted_id)
-                    self.logger.info(f"Created new mailbox {email} for user {user_id}, is_primary: {should_be_primary}")
-                except Exception as insert_error:
-                    # Handle duplicate key error - might happen if mailbox was just deleted
-                    # Try to find and update it instead
-                    if 'E11000' in str(insert_error) or 'duplicate key' in str(insert_error).lower():
-                        self.logger.warning(f"Duplicate key error, attempting to find and update mailbox: {insert_error}")
-                        existing_duplicate = self.mailboxes_collection.find_one({
-                            'user_id': ObjectId(user_id),
-                            'email': email
-                        })
-                        if existing_duplicate:
-                            # Update the existing one with the same logic as above
-                            update_result = self.mailboxes_collection.update_one(
-                                {'_id': existing_duplicate['_id']},
-                                {'$set': mailbox_data}
-                            )
-                            mailbox_id = str(existing_duplicate['_id'])
-                            self.logger.info(f"Updated mailbox after duplicate key error: {email} for user {user_id}, is_primary: {should_be_primary}")
-                        else:
-                            raise insert_error
-                    else:
-                        raise insert_error
+                    self.mailboxes_collection.update_one(
+                        {'_id': mailbox_oid},
+                        {'$set': {'is_primary': True}, '$currentDate': {'updated_at': True}}
+                    )
+                    is_now_primary = True
+                except DuplicateKeyError:
+                    self.logger.info(f"Another mailbox of user {user_id} became primary first; {email} stays non-primary")
+            
+            mailbox_id = str(mailbox_oid)
+            if previous is None:
+                self.logger.info(f"Created new mailbox {email} for user {user_id}, is_primary: {is_now_primary}")
+            elif previous.get('is_active'):
+                self.logger.info(f"Updated existing active mailbox {email} for user {user_id}, is_primary: {is_now_primary}")
+            else:
+                self.logger.info(f"Reactivated previously disconnected mailbox {email} for user {user_id}, is_primary: {is_now_primary}")
             
             return {'success': True, 'mailbox_id': mailbox_id}
             
@@ -292,21 +515,19 @@ class DatabaseMethods:
             self.logger.error(f"Error creating mailbox: {e}")
             return {'success': False, 'error': str(e)}
     
-    def get_mailboxes_by_user_id(self, user_id: str) -> List[Dict]:
-        """Get all mailboxes for a user"""
+    def get_mailboxes_by_user_id(self, user_id: str,
+                                 stream: bool = False) -> Union[List[Dict], Iterator[Dict]]:
+        """Get all mailboxes for a user (as a lazily-fetched generator if stream is set)"""
         try:
-            mailboxes = list(self.mailboxes_collection.find({
-                'user_id': ObjectId(user_id),
-                'is_active': True
-            }))
-            
-            for mailbox in mailboxes:
-                mailbox['mailbox_id'] = str(mailbox['_id'])
-                mailbox.pop('_id', None)
-                mailbox.pop('password', None)
-                mailbox.pop('access_token', None)  # Don't expose tokens
+            # Secrets are excluded server-side so they never cross the wire
+            cursor = self._mailboxes_read.find(
+                {'user_id': ObjectId(user_id), 'is_active': True},
+                projection=_MAILBOX_LIST_PROJECTION
+            )
             
-            return mailboxes
+            if stream:
+                return self._logged_stream(_iter_mailboxes(cursor.batch_size(STREAM_BATCH_SIZE)), 'getting mailboxes')
+            return list(_iter_mailboxes(cursor))
         except Exception as e:
             self.logger.error(f"Error getting mailboxes: {e}")
             return []
@@ -331,39 +552,23 @@ class DatabaseMethods:
     
     # ==================== CAMPAIGN CREATION METHODS ====================
     
-    def create_campaign(self, user_id: str, mailbox_id: str, campaign_name: str,
-                       subject: str, message: str, duration: int, start_time: datetime,
+    def create_campaign(self, user_id: Union[str, ObjectId], mailbox_id: Union[str, ObjectId],
+                       campaign_name: str, subject: str, message: str, duration: int, start_time: datetime,
                        total_recipients: int = 0) -> Dict:
         """Create a new campaign in campaign_creation_table"""
         try:
-            import uuid
-            
-            import uuid
-            campaign_id = str(uuid.uuid4())
-            end_time = start_time + timedelta(hours=duration)
-            
-            campaign_data = {
-                'campaign_id': campaign_id,
-                'user_id': ObjectId(user_id),
-                'mailbox_id': ObjectId(mailbox_id),
-                'campaign_name': campaign_name,
-                'subject': subject,
-                'message': message,
-                'duration': duration,
-                'start_time': start_time,
-                'end_time': end_time,
-                'status': 'scheduled' if start_time > datetime.now(timezone.utc) else 'active',
-                'total_recipients': total_recipients,
-                'created_at': datetime.now(timezone.utc),
-                'updated_at': datetime.now(timezone.utc),
-                'created_by': ObjectId(user_id)
-            }
+            user_oid = _to_object_id(user_id)
+            mailbox_oid = _to_object_id(mailbox_id)
+            campaign_data = _campaign_document(user_oid, mailbox_oid, campaign_name, subject, message,
+                                               duration, start_time, total_recipients,
+                                               datetime.now(timezone.utc))
+            campaign_id = campaign_data['campaign_id']
             
             result = self.campaigns_collection.insert_one(campaign_data)
             
             if result.inserted_id:
                 # Create initial campaign metrics
-                self.create_campaign_metrics(campaign_id, user_id, mailbox_id)
+                self.create_campaign_metrics(campaign_id, user_oid, mailbox_oid)
                 
                 self.logger.info(f"Campaign created: {campaign_name} ({campaign_id})")
                 return {'success': True, 'campaign_id': campaign_id}
@@ -374,24 +579,107 @@ class DatabaseMethods:
             self.logger.error(f"Error creating campaign: {e}")
             return {'success': False, 'error': str(e)}
     
-    def get_campaigns_by_user_id(self, user_id: str, status: str = None) -> List[Dict]:
-        """Get all campaigns for a user"""
+    def create_campaigns_bulk(self, campaigns: List[Dict]) -> Dict:
+        """Create many campaigns (and their initial metrics) with batched bulk writes
+        
+        Each item takes the same keyword arguments as create_campaign. On a partial
+        failure, campaign_ids still lists the campaigns that were created; a campaign
+        whose metrics could not be written is removed again.
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            campaign_docs = []
+            metrics_docs = []
+            for campaign in campaigns:
+                user_oid = _to_object_id(campaign['user_id'])
+                mailbox_oid = _to_object_id(campaign['mailbox_id'])
+                campaign_doc = _campaign_document(
+                    user_oid, mailbox_oid, campaign['campaign_name'], campaign['subject'],
+                    campaign['message'], campaign['duration'], campaign['start_time'],
+                    campaign.get('total_recipients', 0), now
+                )
+                campaign_docs.append(campaign_doc)
+                metrics_docs.append(_initial_metrics_document(campaign_doc['campaign_id'], user_oid, mailbox_oid, now))
+            
+            inserted_campaigns, errors = _bulk_insert(self.campaigns_collection, campaign_docs)
+            created = {doc['campaign_id'] for doc in inserted_campaigns}
+            
+            metrics_docs = [doc for doc in metrics_docs if doc['campaign_id'] in created]
+            inserted_metrics, metrics_errors = _bulk_insert(self.campaign_metrics_collection, metrics_docs)
+            errors.extend(metrics_errors)
+            
+            # Don't leave campaigns behind without their metrics document
+            with_metrics = {doc['campaign_id'] for doc in inserted_metrics}
+            orphans = created - with_metrics
+            if orphans:
+                self.campaigns_collection.delete_many({'campaign_id': {'$in': list(orphans)}})
+            
+            campaign_ids = [doc['campaign_id'] for doc in campaign_docs if doc['campaign_id'] in with_metrics]
+            if errors:
+                self.logger.error(f"Bulk created {len(campaign_ids)} of {len(campaign_docs)} campaigns: {errors[0]}")
+                return {'success': False, 'error': errors[0], 'campaign_ids': campaign_ids}
+            
+            self.logger.info(f"Bulk created {len(campaign_ids)} campaigns")
+            return {'success': True, 'campaign_ids': campaign_ids}
+            
+        except Exception as e:
+            self.logger.error(f"Error bulk creating campaigns: {e}")
+            return {'success': False, 'error': str(e)}
+    
+    def get_campaigns_by_user_id(self, user_id: str, status: str = None,
+                                 include_body: bool = False, stream: bool = False,
+                                 limit: int = 100) -> Union[List[Dict], Iterator[Dict]]:
+        """Get a user's most recent campaigns (message body only if include_body is set,
+        as a lazily-fetched generator if stream is set, limit=0 for all)"""
         try:
             query = {'user_id': ObjectId(user_id)}
             if status:
                 query['status'] = status
             
-            campaigns = list(self.campaigns_collection.find(query).sort('created_at', -1))
+            projection = _CAMPAIGN_WITH_BODY_PROJECTION if include_body else _CAMPAIGN_LIST_PROJECTION
+            
+            # The (user_id, created_at desc) index returns documents already in this order, so no in-memory sort
+            cursor = (self._campaigns_read.find(query, projection=projection)
+                      .sort('created_at', -1)
+                      .limit(limit))
+            
+            if stream:
+                return self._logged_stream(_iter_campaigns(cursor.batch_size(STREAM_BATCH_SIZE)), 'getting campaigns')
+            return list(_iter_campaigns(cursor))
+        except Exception as e:
+            self.logger.error(f"Error getting campaigns: {e}")
+            return []
+    
+    def get_campaigns_with_metrics(self, user_id: str) -> List[Dict]:
+        """Get all campaigns for a user joined with their metrics in a single aggregation"""
+        try:
+            pipeline = [
+                # Filter and sort before the join so only this user's campaigns are looked up
+                {'$match': {'user_id': ObjectId(user_id)}},
+                {'$sort': {'created_at': -1}},
+                {'$project': _CAMPAIGN_LIST_PROJECTION},
+                {'$lookup': {
+                    'from': self.campaign_metrics_collection.name,
+                    'localField': 'campaign_id',
+                    'foreignField': 'campaign_id',
+                    'as': 'metrics'
+                }},
+                {'$unwind': {'path': '$metrics', 'preserveNullAndEmptyArrays': True}},
+                {'$project': {'metrics._id': 0, 'metrics.user_id': 0, 'metrics.mailbox_id': 0,
+                              'metrics.campaign_id': 0}}
+            ]
+            
+            campaigns = list(_iter_campaigns(self._campaigns_read.aggregate(pipeline)))
             
             for campaign in campaigns:
-                campaign['user_id'] = str(campaign['user_id'])
-                campaign['mailbox_id'] = str(campaign['mailbox_id'])
-                campaign['created_by'] = str(campaign.get('created_by', ''))
-                campaign.pop('_id', None)
+                if campaign.get('metrics') is not None:
+                    _unpack_metrics(campaign['metrics'])
+                else:
+                    campaign['metrics'] = None
             
             return campaigns
         except Exception as e:
-            self.logger.error(f"Error getting campaigns: {e}")
+            self.logger.error(f"Error getting campaigns with metrics: {e}")
             return []
     
     def get_campaign_by_id(self, campaign_id: str) -> Optional[Dict]:
@@ -412,27 +700,12 @@ class DatabaseMethods:
     
     # ==================== CAMPAIGN MATRIX METHODS ====================
     
-    def create_campaign_metrics(self, campaign_id: str, user_id: str, mailbox_id: str) -> bool:
+    def create_campaign_metrics(self, campaign_id: str, user_id: Union[str, ObjectId],
+                                mailbox_id: Union[str, ObjectId]) -> bool:
         """Create initial campaign metrics record"""
         try:
-            metrics_data = {
-                'campaign_id': campaign_id,
-                'user_id': ObjectId(user_id),
-                'mailbox_id': ObjectId(mailbox_id),
-                'total_sent': 0,
-                'total_delivered': 0,
-                'total_opened': 0,
-                'total_clicks': 0,
-                'total_bounced': 0,
-                'total_replied': 0,
-                'total_unsubscribed': 0,
-                'open_rate': 0,
-                'click_rate': 0,
-                'bounce_rate': 0,
-                'reply_rate': 0,
-                'created_at': datetime.now(timezone.utc),
-                'last_updated': datetime.now(timezone.utc)
-            }
+            metrics_data = _initial_metrics_document(campaign_id, _to_object_id(user_id),
+                                                     _to_object_id(mailbox_id), datetime.now(timezone.utc))
             
             result = self.campaign_metrics_collection.insert_one(metrics_data)
             return bool(result.inserted_id)
@@ -444,14 +717,11 @@ class DatabaseMethods:
     def update_campaign_metrics(self, campaign_id: str, metrics: Dict) -> bool:
         """Update campaign metrics"""
         try:
-            update_data = {
-                **metrics,
-                'last_updated': datetime.now(timezone.utc)
-            }
+            update_data = {_metric_path(field): value for field, value in metrics.items()}
             
             result = self.campaign_metrics_collection.update_one(
                 {'campaign_id': campaign_id},
-                {'$set': update_data}
+                {'$set': update_data, '$currentDate': {'last_updated': True}}
             )
             
             return result.modified_count > 0
@@ -460,6 +730,48 @@ class DatabaseMethods:
             self.logger.error(f"Error updating campaign metrics: {e}")
             return False
     
+    def increment_campaign_metrics(self, campaign_id: str, deltas: Dict[str, int]) -> bool:
+        """Atomically add deltas to campaign counters and recompute the rates server-side
+        
+        Example: increment_campaign_metrics(campaign_id, {'total_sent': 1, 'total_delivered': 1})
+        """
+        try:
+            if not deltas:
+                return False
+            
+            result = self.campaign_metrics_collection.update_one(
+                {'campaign_id': campaign_id},
+                _metrics_increment_pipeline(deltas)
+            )
+            
+            return result.modified_count > 0
+            
+        except Exception as e:
+            self.logger.error(f"Error incrementing campaign metrics: {e}")
+            return False
+    
+    def increment_campaign_metrics_bulk(self, batch: List[Tuple[str, Dict[str, int]]]) -> int:
+        """Apply many (campaign_id, deltas) increments with batched bulk writes
+        
+        Returns the number of metrics documents modified. Like increment_campaign_metrics,
+        an unknown campaign_id is skipped rather than created.
+        """
+        try:
+            ops = [
+                UpdateOne({'campaign_id': campaign_id}, _metrics_increment_pipeline(deltas))
+                for campaign_id, deltas in batch if deltas
+            ]
+            
+            changed = 0
+            for chunk in _chunked(ops, BULK_WRITE_CHUNK_SIZE):
+                result = self.campaign_metrics_collection.bulk_write(chunk, ordered=False)
+                changed += result.modified_count
+            return changed
+            
+        except Exception as e:
+            self.logger.error(f"Error bulk incrementing campaign metrics: {e}")
+            return 0
+    
     def get_campaign_metrics(self, campaign_id: str) -> Optional[Dict]:
         """Get campaign metrics by campaign_id"""
         try:
@@ -469,25 +781,26 @@ class DatabaseMethods:
                 metrics['user_id'] = str(metrics['user_id'])
                 metrics['mailbox_id'] = str(metrics['mailbox_id'])
                 metrics.pop('_id', None)
+                _unpack_metrics(metrics)
             
             return metrics
         except Exception as e:
             self.logger.error(f"Error getting campaign metrics: {e}")
             return None
     
-    def get_all_campaign_metrics_by_user_id(self, user_id: str) -> List[Dict]:
-        """Get all campaign metrics for a user"""
+    def get_all_campaign_metrics_by_user_id(self, user_id: str,
+                                            stream: bool = False) -> Union[List[Dict], Iterator[Dict]]:
+        """Get all campaign metrics for a user (as a lazily-fetched generator if stream is set)"""
         try:
-            metrics_list = list(self.campaign_metrics_collection.find({
-                'user_id': ObjectId(user_id)
-            }))
-            
-            for metrics in metrics_list:
-                metrics['user_id'] = str(metrics['user_id'])
-                metrics['mailbox_id'] = str(metrics['mailbox_id'])
-                metrics.pop('_id', None)
+            cursor = self._campaign_metrics_read.find(
+                {'user_id': ObjectId(user_id)},
+                projection=_METRICS_LIST_PROJECTION
+            )
             
-            return metrics_list
+            if stream:
+                return self._logged_stream(map(_unpack_metrics, cursor.batch_size(STREAM_BATCH_SIZE)),
+                                           'getting campaign metrics')
+            return [_unpack_metrics(metrics) for metrics in cursor]
         except Exception as e:
             self.logger.error(f"Error getting campaign metrics: {e}")
             return []
@@ -1,100 +1,146 @@
 import sys
 import os
 from datetime import datetime, timezone, timedelta
-from pymongo import MongoClient
+from mongo_client import get_client
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Connect to MongoDB
-mongo_url = os.getenv('MONGO_URL')
-if not mongo_url:
-    print("ERROR: MONGO_URL not found in environment")
-    sys.exit(1)
-
-client = MongoClient(mongo_url)
-db = client['xsmart_mail_send']
-
-# Get tracking collection
-tracking_collection = db['email_tracking']
-
-# Sample a few documents
-print("=" * 80)
-print("TRACKING DOCUMENTS SAMPLE")
-print("=" * 80)
-
-sample_docs = list(tracking_collection.find().limit(5))
-for i, doc in enumerate(sample_docs, 1):
-    print(f"\nDocument {i}:")
-    print(f"  Campaign ID: {doc.get('campaign_id')}")
-    print(f"  Recipient: {doc.get('recipient_email')}")
-    print(f"  Sent At: {doc.get('sent_at')}")
-    print(f"  Sent At Type: {type(doc.get('sent_at'))}")
-    if isinstance(doc.get('sent_at'), datetime):
-        print(f"  Sent At Timezone: {doc.get('sent_at').tzinfo}")
-    print(f"  Bounced: {doc.get('bounced')}")
-    print(f"  Delivered: {doc.get('delivered')}")
-    print(f"  Opens: {doc.get('opens', 0)}")
-    print(f"  Clicks: {doc.get('clicks', 0)}")
-
-# Test datetime comparisons
-print("\n" + "=" * 80)
-print("TESTING DATETIME COMPARISONS")
-print("=" * 80)
-
-now = datetime.now(timezone.utc)
-print(f"\nNow (UTC): {now}")
-print(f"Now Type: {type(now)}")
-print(f"Now Timezone: {now.tzinfo}")
-
-today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-print(f"\nToday Start: {today_start}")
-print(f"Today Start Type: {type(today_start)}")
-print(f"Today Start Timezone: {today_start.tzinfo}")
-
-week_start = now - timedelta(days=7)
-print(f"\nWeek Start: {week_start}")
-print(f"Week Start Type: {type(week_start)}")
-print(f"Week Start Timezone: {week_start.tzinfo}")
-
-# Try to compare with a sample document
-if sample_docs:
-    doc = sample_docs[0]
-    sent_at = doc.get('sent_at')
-    print(f"\n\nTesting comparison with first document:")
-    print(f"  sent_at: {sent_at}")
-    print(f"  sent_at type: {type(sent_at)}")
+
+def get_tracking_stats(tracking_collection, today_start):
+    """Fetch samples, totals and per-campaign counts in a single round-trip
     
-    if isinstance(sent_at, datetime):
-        print(f"  sent_at timezone: {sent_at.tzinfo}")
+    Importable so a health check can reuse an existing connection instead of
+    running this script.
+    """
+    pipeline = [
+        {"$facet": {
+            "samples": [
+                {"$limit": 5},
+                {"$project": {
+                    "campaign_id": 1, "recipient_email": 1, "sent_at": 1,
+                    "bounced": 1, "delivered": 1, "opens": 1, "clicks": 1,
+                    "sent_at_type": {"$type": "$sent_at"}
+                }}
+            ],
+            "total": [{"$count": "n"}],
+            "sent_today": [
+                {"$match": {"sent_at": {"$gte": today_start}}},
+                {"$count": "n"}
+            ],
+            "per_campaign": [
+                {"$group": {"_id": "$campaign_id", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": 10}
+            ]
+        }}
+    ]
+    facets = next(tracking_collection.aggregate(pipeline), {})
+    return {
+        'samples': facets.get('samples', []),
+        'total': facets['total'][0]['n'] if facets.get('total') else 0,
+        'sent_today': facets['sent_today'][0]['n'] if facets.get('sent_today') else 0,
+        'per_campaign': facets.get('per_campaign', [])
+    }
+
+
+def main():
+    # Connect to MongoDB
+    mongo_url = os.getenv('MONGO_URL')
+    if not mongo_url:
+        print("ERROR: MONGO_URL not found in environment")
+        sys.exit(1)
+
+    # Reuse the shared client; it is not closed here
+    client = get_client(mongo_url)
+    db = client['xsmart_mail_send']
+
+    # Get tracking collection
+    tracking_collection = db['email_tracking']
+
+    # Reference datetimes (needed up front for the server-side comparison)
+    now = datetime.now(timezone.utc)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = now - timedelta(days=7)
+
+    stats = get_tracking_stats(tracking_collection, today_start)
+    sample_docs = stats['samples']
+    total_count = stats['total']
+    sent_today_count = stats['sent_today']
+
+    # Sample a few documents
+    print("=" * 80)
+    print("TRACKING DOCUMENTS SAMPLE")
+    print("=" * 80)
+
+    for i, doc in enumerate(sample_docs, 1):
+        print(f"\nDocument {i}:")
+        print(f"  Campaign ID: {doc.get('campaign_id')}")
+        print(f"  Recipient: {doc.get('recipient_email')}")
+        print(f"  Sent At: {doc.get('sent_at')}")
+        print(f"  Sent At BSON Type: {doc.get('sent_at_type')}")
+        if isinstance(doc.get('sent_at'), datetime):
+            print(f"  Sent At Timezone: {doc.get('sent_at').tzinfo}")
+        print(f"  Bounced: {doc.get('bounced')}")
+        print(f"  Delivered: {doc.get('delivered')}")
+        print(f"  Opens: {doc.get('opens', 0)}")
+        print(f"  Clicks: {doc.get('clicks', 0)}")
+
+    # Test datetime comparisons
+    print("\n" + "=" * 80)
+    print("TESTING DATETIME COMPARISONS")
+    print("=" * 80)
+
+    print(f"\nNow (UTC): {now}")
+    print(f"Now Type: {type(now)}")
+    print(f"Now Timezone: {now.tzinfo}")
+
+    print(f"\nToday Start: {today_start}")
+    print(f"Today Start Type: {type(today_start)}")
+    print(f"Today Start Timezone: {today_start.tzinfo}")
+
+    print(f"\nWeek Start: {week_start}")
+    print(f"Week Start Type: {type(week_start)}")
+    print(f"Week Start Timezone: {week_start.tzinfo}")
+
+    # Try to compare with a sample document
+    if sample_docs:
+        doc = sample_docs[0]
+        sent_at = doc.get('sent_at')
+        print(f"\n\nTesting comparison with first document:")
+        print(f"  sent_at: {sent_at}")
+        print(f"  sent_at type: {type(sent_at)}")
+    
+        if isinstance(sent_at, datetime):
+            print(f"  sent_at timezone: {sent_at.tzinfo}")
         
-        # Make timezone-aware if needed
-        if sent_at.tzinfo is None:
-            sent_at_aware = sent_at.replace(tzinfo=timezone.utc)
-            print(f"  sent_at (made aware): {sent_at_aware}")
-        else:
-            sent_at_aware = sent_at
+            # Make timezone-aware if needed
+            if sent_at.tzinfo is None:
+                sent_at_aware = sent_at.replace(tzinfo=timezone.utc)
+                print(f"  sent_at (made aware): {sent_at_aware}")
+            else:
+                sent_at_aware = sent_at
         
-        try:
-            result = sent_at_aware >= today_start
-            print(f"  ✅ Comparison successful: sent_at >= today_start = {result}")
-        except Exception as e:
-            print(f"  ❌ Comparison failed: {e}")
-
-# Count total tracking documents
-total_count = tracking_collection.count_documents({})
-print(f"\n\nTotal tracking documents: {total_count}")
-
-# Count by campaign
-print("\nDocuments per campaign:")
-pipeline = [
-    {"$group": {"_id": "$campaign_id", "count": {"$sum": 1}}},
-    {"$sort": {"count": -1}},
-    {"$limit": 10}
-]
-for result in tracking_collection.aggregate(pipeline):
-    print(f"  Campaign {result['_id']}: {result['count']} emails")
-
-client.close()
-print("\n" + "=" * 80)
+            try:
+                result = sent_at_aware >= today_start
+                print(f"  ✅ Comparison successful: sent_at >= today_start = {result}")
+            except Exception as e:
+                print(f"  ❌ Comparison failed: {e}")
+
+    # Server-side comparison (evaluated by MongoDB in the same aggregation)
+    print(f"\nDocuments with sent_at >= today_start (server-side): {sent_today_count}")
+
+    # Count total tracking documents
+    print(f"\n\nTotal tracking documents: {total_count}")
+
+    # Count by campaign
+    print("\nDocuments per campaign:")
+    for result in stats['per_campaign']:
+        print(f"  Campaign {result['_id']}: {result['count']} emails")
+
+    print("\n" + "=" * 80)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,88 @@
 
 # enhanced_email_warmup.py
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import time
 import random
 from datetime import datetime, timezone, timedelta
+from functools import lru_cache
 from typing import List, Dict, Optional
+from urllib.parse import quote
 import uuid
 import re
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import logging.handlers
+import queue
 from database import DatabaseManager
 from config import Config
 
+log = logging.getLogger(__name__)
+_log_queue = queue.SimpleQueue()
+
+
+def start_log_listener() -> logging.handlers.QueueListener:
+    """Send warmup logs through a queue to the root logger's handlers
+
+    Worker threads then never block on handler I/O. Call once the application's logging
+    is configured, and stop() the returned listener at shutdown.
+    """
+    # With no root handlers configured, fall back to what logging itself would use
+    handlers = logging.getLogger().handlers or [logging.lastResort]
+    listener = logging.handlers.QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    log.addHandler(logging.handlers.QueueHandler(_log_queue))
+    log.propagate = False  # the listener already delivers to the root handlers
+    return listener
+
+
+# Microsoft Graph accepts at most 20 sub-requests per JSON batch
+GRAPH_BATCH_LIMIT = 20
+GRAPH_BATCH_MAX_ATTEMPTS = 3
+# permanentDelete statuses that mean "not allowed here" rather than "message gone"
+PERMANENT_DELETE_REFUSED_STATUSES = {400, 403, 405}
+# (connect, read) timeout for Graph calls so a stalled connection can't hang a worker
+GRAPH_REQUEST_TIMEOUT = (10, 30)
+
+# Recipient-side search for warmup mail; only ids are needed for deletion
+RECEIVED_SEARCH_PATH = "/me/messages?$filter={filter}&$select=id&$top=50"
+
+# Graph access tokens live about an hour; cached headers are dropped a little before that
+HEADERS_CACHE_TTL_SECONDS = 50 * 60
+
+# How long a mailbox token lookup is reused within a campaign
+TOKEN_CACHE_TTL_SECONDS = 300
+
+# Upper bound on mailboxes processed concurrently during a campaign
+MAX_PARALLEL_MAILBOXES = 10
+
+# Extended property stamped on every warmup message so it can be identified later
+WARMUP_ID_PROPERTY = "String {6f1c0a4e-3b7d-4c52-9a8e-2d5f7b1e9c34} Name WarmupID"
+
 class EnhancedEmailWarmupService:
-    def __init__(self, db_manager: DatabaseManager):
-        self.db_manager = db_manager
-        self.base_url = "https://graph.microsoft.com/v1.0"
-        self.sent_message_ids = []
-        self.campaign_stats = {}
+    SUBJECTS = (
+        "Quick check-in",
+        "Following up on our conversation",
+        "Hope you're doing well",
+        "Brief update",
+        "Touching base",
+        "Quick hello",
+        "Weekly sync",
+        "Monthly update",
+        "Project status",
+        "Team coordination",
+        "Quarterly review",
+        "Partnership discussion",
+        "Meeting follow-up",
+        "Important announcement",
+        "Schedule coordination"
+    )
     
-    def get_headers(self, access_token: str) -> Dict:
-        """Get request headers with access token"""
-        return {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json'
-        }
-    
-    def make_graph_request(self, endpoint: str, access_token: str, method: str = 'GET', data: Dict = None) -> Dict:
-        """Make a request to Microsoft Graph API"""
-        url = f"{self.base_url}{endpoint}"
-        headers = self.get_headers(access_token)
-        
-        try:
-            if method == 'GET':
-                response = requests.get(url, headers=headers)
-            elif method == 'POST':
-                response = requests.post(url, headers=headers, json=data)
-            elif method == 'DELETE':
-                response = requests.delete(url, headers=headers)
-            
-            response.raise_for_status()
-            
-            if response.content:
-                try:
-                    return response.json()
-                except ValueError:
-                    return {'success': True, 'status_code': response.status_code}
-            return {'success': True, 'status_code': response.status_code}
-            
-        except requests.exceptions.RequestException as e:
-            print(f"API request failed: {e}")
-            return {'error': str(e), 'status_code': getattr(e.response, 'status_code', 500)}
-    
-    def create_warmup_email(self, sender_email: str, recipient_email: str) -> Dict:
-        """Create a warm-up email with natural content"""
-        
-        subjects = [
-            "Quick check-in",
-            "Following up on our conversation",
-            "Hope you're doing well",
-            "Brief update",
-            "Touching base",
-            "Quick hello",
-            "Weekly sync",
-            "Monthly update",
-            "Project status",
-            "Team coordination",
-            "Quarterly review",
-            "Partnership discussion",
-            "Meeting follow-up",
-            "Important announcement",
-            "Schedule coordination"
-        ]
-        
-        bodies = [
-            """Hi there,
+    BODIES = (
+        """Hi there,
 
 I hope this email finds you well. I wanted to reach out for a quick check-in and see how things are going on your end.
 
@@ -83,8 +90,8 @@ If you have a moment, I'd love to hear about any updates or developments you mig
 
 Best regards,
 {sender_name}""",
-            
-            """Hello,
+        
+        """Hello,
 
 I hope you're having a great day! I wanted to follow up on our previous conversation and see if there's anything new to discuss.
 
@@ -92,8 +99,8 @@ Please let me know if you need any assistance or have any questions.
 
 Best,
 {sender_name}""",
-            
-            """Hi,
+        
+        """Hi,
 
 I hope everything is going smoothly for you. I wanted to send a quick update and check if there's anything I can help you with.
 
@@ -101,8 +108,8 @@ Looking forward to hearing from you soon.
 
 Kind regards,
 {sender_name}""",
-            
-            """Hello,
+        
+        """Hello,
 
 I trust you're doing well. I wanted to touch base and see how your projects are progressing.
 
@@ -110,8 +117,8 @@ If there's anything you'd like to discuss or if you need any support, please don
 
 Best wishes,
 {sender_name}""",
-            
-            """Hi,
+        
+        """Hi,
 
 I hope this message finds you in good spirits. I wanted to reach out to see if there are any updates on your end.
 
@@ -119,12 +126,212 @@ Please feel free to share any news or developments you think might be relevant.
 
 Warm regards,
 {sender_name}"""
-        ]
+    )
+    
+    # Common subject keywords from sent emails, used to find them in recipient mailboxes
+    CLEANUP_SUBJECT_KEYWORDS = (
+        "Quick check-in", "Following up", "Hope you're doing well",
+        "Brief update", "Touching base", "Quick hello", "Weekly sync",
+        "Monthly update", "Project status", "Team coordination"
+    )
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self.base_url = "https://graph.microsoft.com/v1.0"
+        self.sent_message_ids = []
+        self.campaign_stats = {}
+        
+        # One pooled session per service so Graph calls reuse keep-alive connections
+        self.session = requests.Session()
+        # Only idempotent verbs are retried (a retried POST could send a warmup email twice).
+        # 429s are not retried here: they reach make_graph_request, whose Retry-After
+        # handling paces the sender and the batch calls.
+        retries = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=[500, 502, 503, 504],
+            raise_on_status=False  # hand the last response back instead of raising RetryError
+        )
+        self.session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retries))
+        
+        # Per-sender pacing: monotonic time before which the mailbox must not send again
+        self._next_send_at: Dict[str, float] = {}
+        
+        # Mailbox tokens looked up during a campaign: email -> (fetched_at, token document)
+        self._token_cache: Dict[str, tuple] = {}
+        self._token_cache_lock = threading.Lock()
+        
+        # Request headers per access token: token -> (created_at, headers)
+        self._headers_cache: Dict[str, tuple] = {}
+        self._headers_cache_lock = threading.Lock()
+        
+        # Set by notify_refresh() to cut the background process's current wait short
+        self._wake = threading.Event()
+    
+    def get_headers(self, access_token: str) -> Dict:
+        """Get request headers with access token (cached per token; callers must not mutate)"""
+        now = time.monotonic()
+        cached = self._headers_cache.get(access_token)
+        if cached and now - cached[0] < HEADERS_CACHE_TTL_SECONDS:
+            return cached[1]
+        
+        headers = {
+            'Authorization': f'Bearer {access_token}',
+            'Content-Type': 'application/json',
+            # Immutable ids stay valid when a sent draft moves to Sent Items
+            'Prefer': 'IdType="ImmutableId"'
+        }
+        with self._headers_cache_lock:
+            # Drop headers for tokens that have since expired or been refreshed
+            for token in [token for token, (created, _) in self._headers_cache.items()
+                          if now - created >= HEADERS_CACHE_TTL_SECONDS]:
+                del self._headers_cache[token]
+            self._headers_cache[access_token] = (now, headers)
+        return headers
+    
+    def make_graph_request(self, endpoint: str, access_token: str, method: str = 'GET', data: Dict = None) -> Dict:
+        """Make a request to Microsoft Graph API"""
+        url = f"{self.base_url}{endpoint}"
+        headers = self.get_headers(access_token)
+        
+        try:
+            response = self.session.request(method, url, headers=headers, json=data, timeout=GRAPH_REQUEST_TIMEOUT)
+            response.raise_for_status()
+            
+            if response.content:
+                try:
+                    return response.json()
+                except ValueError:
+                    return {'success': True, 'status_code': response.status_code}
+            return {'success': True, 'status_code': response.status_code}
+            
+        except requests.exceptions.RequestException as e:
+            log.warning(f"API request failed: {e}")
+            error = {'error': str(e), 'status_code': getattr(e.response, 'status_code', 500)}
+            if error['status_code'] == 429:
+                error['retry_after'] = self._parse_retry_after(e.response.headers.get('Retry-After'))
+            return error
+    
+    @staticmethod
+    def _parse_retry_after(value, default: int = 1) -> int:
+        """Seconds from a Retry-After header, falling back to a default"""
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+    
+    def _get_tokens_cached(self, email: str) -> Optional[Dict]:
+        """Get a mailbox's tokens, reusing lookups made in the last few minutes"""
+        now = time.monotonic()
+        with self._token_cache_lock:
+            cached = self._token_cache.get(email)
+        if cached and now - cached[0] < TOKEN_CACHE_TTL_SECONDS:
+            return cached[1]
+        
+        tokens = self.db_manager.get_user_tokens(email)
+        if tokens:
+            with self._token_cache_lock:
+                self._token_cache[email] = (now, tokens)
+        return tokens
+    
+    def _wait_for_send_slot(self, sender_email: str):
+        """Sleep until the sender's pacing window allows another send"""
+        wait = self._next_send_at.get(sender_email, 0) - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+    
+    def _schedule_next_send(self, sender_email: str, delay: float):
+        """Push the sender's next allowed send time at least `delay` seconds out"""
+        next_at = time.monotonic() + max(0, delay)
+        self._next_send_at[sender_email] = max(self._next_send_at.get(sender_email, 0), next_at)
+    
+    def _note_throttle(self, sender_email: str, response: Dict):
+        """Honour a 429 Retry-After for the sender's mailbox"""
+        if 'retry_after' in response:
+            log.warning(f"⏸️  {sender_email} throttled, next send in {response['retry_after']}s")
+            self._schedule_next_send(sender_email, response['retry_after'])
+    
+    def batch_graph_requests(self, requests_list: List[Dict], access_token: str) -> Dict[str, int]:
+        """Send Graph sub-requests through JSON batching ($batch), 20 per call
+        
+        Each item is {'method': ..., 'url': ...} with an optional 'id'. Throttled
+        (429) sub-requests, or whole batch calls, are retried after their
+        Retry-After. Returns the final HTTP status per request id.
+        """
+        pending = [dict(request, id=str(request.get('id', index))) for index, request in enumerate(requests_list)]
+        statuses = {}
+        
+        for attempt in range(GRAPH_BATCH_MAX_ATTEMPTS):
+            throttled = []
+            retry_after = 0
+            requests_by_id = {request['id']: request for request in pending}
+            
+            for start in range(0, len(pending), GRAPH_BATCH_LIMIT):
+                chunk = pending[start:start + GRAPH_BATCH_LIMIT]
+                response = self.make_graph_request('/$batch', access_token, 'POST', {'requests': chunk})
+                
+                if 'error' in response:
+                    for request in chunk:
+                        statuses[request['id']] = response.get('status_code', 500)
+                    # The whole batch call was throttled: retry the chunk like a throttled sub-request
+                    if response.get('status_code') == 429:
+                        throttled.extend(chunk)
+                        retry_after = max(retry_after, response.get('retry_after', 1))
+                    continue
+                
+                for sub_response in response.get('responses', []):
+                    request_id = str(sub_response.get('id'))
+                    status = sub_response.get('status', 500)
+                    statuses[request_id] = status
+                    if status == 429 and request_id in requests_by_id:
+                        throttled.append(requests_by_id[request_id])
+                        headers = sub_response.get('headers') or {}
+                        retry_after = max(retry_after, self._parse_retry_after(headers.get('Retry-After')))
+            
+            if not throttled or attempt == GRAPH_BATCH_MAX_ATTEMPTS - 1:
+                break
+            log.warning(f"⏸️  {len(throttled)} batched requests throttled, retrying in {retry_after}s")
+            time.sleep(retry_after)
+            pending = throttled
+        
+        return statuses
+    
+    def delete_messages(self, message_ids: List[str], access_token: str) -> int:
+        """Delete messages from one mailbox using batched requests; returns how many were deleted
         
-        sender_name = sender_email.split('@')[0].replace('.', ' ').title()
+        Messages are purged with permanentDelete so they skip Deleted Items; ids the
+        mailbox refuses to purge (e.g. under a retention policy) fall back to DELETE.
+        """
+        if not message_ids:
+            return 0
+        statuses = self.batch_graph_requests(
+            [{'id': str(index), 'method': 'POST', 'url': f'/me/messages/{message_id}/permanentDelete'}
+             for index, message_id in enumerate(message_ids)],
+            access_token
+        )
+        deleted = sum(1 for status in statuses.values() if 200 <= status < 300)
         
-        subject = random.choice(subjects)
-        body = random.choice(bodies).format(sender_name=sender_name)
+        refused = [message_ids[int(request_id)] for request_id, status in statuses.items()
+                   if status in PERMANENT_DELETE_REFUSED_STATUSES]
+        if refused:
+            statuses = self.batch_graph_requests(
+                [{'id': str(index), 'method': 'DELETE', 'url': f'/me/messages/{message_id}'}
+                 for index, message_id in enumerate(refused)],
+                access_token
+            )
+            deleted += sum(1 for status in statuses.values() if 200 <= status < 300)
+        return deleted
+    
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _sender_name(sender_email: str) -> str:
+        """Display name derived from the mailbox local part"""
+        return sender_email.split('@')[0].replace('.', ' ').title()
+    
+    def create_warmup_email(self, sender_email: str, recipient_email: str) -> Dict:
+        """Create a warm-up email with natural content"""
+        subject = random.choice(self.SUBJECTS)
+        body = random.choice(self.BODIES).replace('{sender_name}', self._sender_name(sender_email))
         
         return {
             "message": {
@@ -139,6 +346,12 @@ Warm regards,
                             "address": recipient_email
                         }
                     }
+                ],
+                "singleValueExtendedProperties": [
+                    {
+                        "id": WARMUP_ID_PROPERTY,
+                        "value": str(uuid.uuid4())
+                    }
                 ]
             }
         }
@@ -148,107 +361,257 @@ Warm regards,
         try:
             email_data = self.create_warmup_email(sender_email, recipient_email)
             
-            response = self.make_graph_request('/me/sendMail', access_token, 'POST', email_data)
+            # Create a draft first so the (immutable) message id is known without
+            # polling Sent Items, then send it
+            draft = self.make_graph_request('/me/messages', access_token, 'POST', email_data['message'])
             
-            if 'error' in response:
-                print(f"✗ Failed to send email from {sender_email} to {recipient_email}: {response['error']}")
+            if 'error' in draft or not draft.get('id'):
+                self._note_throttle(sender_email, draft)
+                log.warning(f"✗ Failed to create email from {sender_email} to {recipient_email}: {draft.get('error')}")
                 return None
             
-            time.sleep(3)  # Wait for email to appear in sent items
-            
-            sent_messages = self.make_graph_request(
-                f"/me/mailFolders/sentitems/messages?$top=1&$orderby=sentDateTime desc",
-                access_token
-            )
+            message_id = draft['id']
+            response = self.make_graph_request(f'/me/messages/{message_id}/send', access_token, 'POST')
             
-            if sent_messages.get('value'):
-                message_id = sent_messages['value'][0]['id']
-                print(f"✓ Email sent from {sender_email} to {recipient_email} - Message ID: {message_id}")
-                return message_id
-            else:
-                print(f"✗ Failed to get message ID for email from {sender_email} to {recipient_email}")
+            if 'error' in response:
+                self._note_throttle(sender_email, response)
+                log.warning(f"✗ Failed to send email from {sender_email} to {recipient_email}: {response['error']}")
+                # The draft was never sent, so cleanup won't see it; remove it from Drafts now
+                deleted = self.make_graph_request(f'/me/messages/{message_id}', access_token, 'DELETE')
+                if 'error' in deleted:
+                    log.warning(f"✗ Could not delete unsent draft {message_id} from {sender_email}: {deleted['error']}")
                 return None
+            
+            log.debug(f"✓ Email sent from {sender_email} to {recipient_email} - Message ID: {message_id}")
+            return message_id
                 
         except Exception as e:
-            print(f"✗ Error sending email from {sender_email} to {recipient_email}: {e}")
+            log.warning(f"✗ Error sending email from {sender_email} to {recipient_email}: {e}")
             return None
     
-    def delete_email_from_mailbox(self, message_id: str, access_token: str, mailbox_type: str = 'sent') -> bool:
-        """Delete an email from specified mailbox"""
-        try:
-            if mailbox_type == 'sent':
-                # Delete from sent items
-                response = self.make_graph_request(f'/me/messages/{message_id}', access_token, 'DELETE')
-            else:
-                # Delete from inbox
-                response = self.make_graph_request(f'/me/messages/{message_id}', access_token, 'DELETE')
-            
-            if 'error' not in response:
-                print(f"✓ Deleted email from {mailbox_type} mailbox - ID: {message_id}")
-                return True
-            else:
-                print(f"✗ Error deleting email from {mailbox_type} mailbox {message_id}: {response['error']}")
-                return False
-                
-        except Exception as e:
-            print(f"✗ Error deleting email from {mailbox_type} mailbox {message_id}: {e}")
-            return False
+    @staticmethod
+    def _odata_literal(value: str) -> str:
+        """Quote a string for an OData filter"""
+        return "'" + value.replace("'", "''") + "'"
+    
+    @classmethod
+    @lru_cache(maxsize=32)
+    def _subject_keyword_clause(cls, subject_keywords: tuple) -> str:
+        """OData clause matching any keyword in the subject, built once per keyword set"""
+        return ' or '.join(f"contains(subject,{cls._odata_literal(keyword)})" for keyword in subject_keywords)
+    
+    @classmethod
+    def _received_warmup_filter(cls, sender_email: str, subject_keywords: List[str]) -> str:
+        """OData filter for messages from a sender whose subject contains any keyword"""
+        sender_clause = f"from/emailAddress/address eq {cls._odata_literal(sender_email)}"
+        if not subject_keywords:
+            return sender_clause
+        return f"{sender_clause} and ({cls._subject_keyword_clause(tuple(subject_keywords))})"
     
     def find_and_delete_received_emails(self, recipient_email: str, sender_email: str, subject_keywords: List[str]) -> int:
         """Find and delete received emails in target mailbox"""
         try:
-            recipient_data = self.db_manager.get_user_tokens(recipient_email['email'] if isinstance(recipient_email, dict) else recipient_email)
+            recipient_data = self._get_tokens_cached(recipient_email)
             
             if not recipient_data:
-                print(f"✗ No access token found for recipient {recipient_email}")
-                print(f"✗ No access token found for recipient {recipient_email}")
+                log.warning(f"✗ No access token found for recipient {recipient_email}")
                 return 0
             
             access_token = recipient_data['access_token']
-            print("access token",access_token)
-            # Search for emails from sender
-            search_query = f"from:{sender_email}"
-            messages = self.make_graph_request(
-                f"/me/messages?$filter=from/emailAddress/address eq '{sender_email}'&$top=50",
-                access_token
-            )
+            # Let Graph match sender and subject keywords; only ids come back
+            odata_filter = quote(self._received_warmup_filter(sender_email, subject_keywords), safe="$'(),/")
+            messages = self.make_graph_request(RECEIVED_SEARCH_PATH.format(filter=odata_filter), access_token)
             
             if 'value' not in messages:
-                print(f"✗ No messages found from {sender_email} to {recipient_email}")
+                log.debug(f"✗ No messages found from {sender_email} to {recipient_email}")
                 return 0
             
-            deleted_count = 0
-            for message in messages['value']:
-                message_id = message['id']
-                subject = message.get('subject', '')
-                
-                # Check if subject contains any of our warmup keywords
-                if any(keyword.lower() in subject.lower() for keyword in subject_keywords):
-                    if self.delete_email_from_mailbox(message_id, access_token, 'inbox'):
-                        deleted_count += 1
-                        time.sleep(1)  # Small delay between deletions
-            
-            return deleted_count
+            matching_ids = [message['id'] for message in messages['value']]
+            return self.delete_messages(matching_ids, access_token)
             
         except Exception as e:
-            print(f"✗ Error finding and deleting emails for {recipient_email}: {e}")
+            log.error(f"✗ Error finding and deleting emails for {recipient_email}: {e}")
             return 0
     
+    @staticmethod
+    def _worker_count(items) -> int:
+        """Thread pool size for fanning out over senders/recipients"""
+        return max(1, min(len(items), MAX_PARALLEL_MAILBOXES))
+    
+    @staticmethod
+    def _email_list(entries: List) -> List[str]:
+        """Addresses from a list of strings or {'email': ...} dicts"""
+        return [entry['email'] if isinstance(entry, dict) else entry for entry in entries]
+    
+    def _send_from_sender(self, sender_email: str, target_emails: List[str], delay_between_emails: int) -> Dict:
+        """Send one warmup email from a sender to every target (runs in a worker thread)"""
+        result = {'sender': sender_email, 'used': False, 'emails_sent': 0, 'send_failures': 0, 'sent_messages': []}
+        
+        sender_data = self._get_tokens_cached(sender_email)
+        if not sender_data:
+            log.warning(f"✗ No access token found for sender {sender_email}")
+            return result
+        
+        access_token = sender_data['access_token']
+        for target_email in target_emails:
+            self._wait_for_send_slot(sender_email)
+            log.debug(f"📤 Sending from {sender_email} to {target_email}")
+            
+            started = time.monotonic()
+            message_id = self.send_warmup_email(sender_email, target_email, access_token)
+            elapsed = time.monotonic() - started
+            
+            if message_id:
+                result['emails_sent'] += 1
+                result['sent_messages'].append({
+                    'message_id': message_id,
+                    'sender': sender_email,
+                    'recipient': target_email,
+                    'access_token': access_token,
+                    'sent_at': datetime.now(timezone.utc)
+                })
+            else:
+                result['send_failures'] += 1
+            result['used'] = True
+            
+            # Keep the per-mailbox cadence; time spent sending counts toward the delay
+            delay = int(delay_between_emails) + random.randint(-10, 10) - elapsed
+            self._schedule_next_send(sender_email, delay)
+        
+        return result
+    
+    def _cleanup_recipient(self, target_email: str, sender_emails: List[str], subject_keywords: List[str]) -> int:
+        """Delete warmup emails from every sender in one recipient mailbox (runs in a worker thread)"""
+        total_deleted = 0
+        for sender_email in sender_emails:
+            deleted_count = self.find_and_delete_received_emails(
+                target_email, sender_email, subject_keywords
+            )
+            total_deleted += deleted_count
+        
+        log.debug(f"🧹 Cleaned {total_deleted} emails from {target_email}")
+        return total_deleted
+    
+    def _phase_send(self, sender_emails: List, target_emails: List,
+                    delay_between_emails: int, campaign_stats: Dict) -> List[Dict]:
+        """Phase 1: send from every sender to every target; returns the sent messages"""
+        log.info("📧 Phase 1: Sending emails...")
+        
+        touched_senders = set()
+        
+        # Each sender has its own token (and Graph throttle bucket), so senders run in parallel
+        with ThreadPoolExecutor(max_workers=self._worker_count(sender_emails)) as executor:
+            futures = [
+                executor.submit(self._send_from_sender, sender_email, target_emails, delay_between_emails)
+                for sender_email in sender_emails
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                campaign_stats['emails_sent'] += result['emails_sent']
+                campaign_stats['send_failures'] += result['send_failures']
+                campaign_stats['sent_messages'].extend(result['sent_messages'])
+                if result['used']:
+                    touched_senders.add(result['sender'])
+        
+        # Update last used timestamps once per sender
+        if touched_senders:
+            self.db_manager.bulk_update_last_used(list(touched_senders))
+        
+        log.info(f"📊 Sending phase complete:")
+        log.info(f"✅ Successfully sent: {campaign_stats['emails_sent']}")
+        log.info(f"❌ Failed to send: {campaign_stats['send_failures']}")
+        return campaign_stats['sent_messages']
+    
+    def _phase_cleanup(self, campaign_stats: Dict, sender_emails: List, target_emails: List,
+                       cleanup_recipient_mailbox: bool) -> Dict:
+        """Phases 3-4: delete the campaign's emails from both sides, then log the campaign"""
+        try:
+            # Phase 3: Delete emails from sender mailboxes
+            log.info(f"🗑️  Phase 3: Cleaning up sender mailboxes...")
+            
+            # Group messages by sender token so each mailbox is cleaned with batched deletes
+            message_ids_by_token = {}
+            for message_data in campaign_stats['sent_messages']:
+                message_ids_by_token.setdefault(message_data['access_token'], []).append(message_data['message_id'])
+            
+            with ThreadPoolExecutor(max_workers=self._worker_count(message_ids_by_token)) as executor:
+                futures = {
+                    executor.submit(self.delete_messages, message_ids, access_token): len(message_ids)
+                    for access_token, message_ids in message_ids_by_token.items()
+                }
+                for future in as_completed(futures):
+                    deleted = future.result()
+                    campaign_stats['sender_deletions'] += deleted
+                    campaign_stats['delete_failures'] += futures[future] - deleted
+            
+            # Phase 4: Clean up recipient mailboxes (if enabled)
+            if cleanup_recipient_mailbox:
+                log.info(f"🧹 Phase 4: Cleaning up recipient mailboxes...")
+                
+                subject_keywords = self.CLEANUP_SUBJECT_KEYWORDS
+                
+                with ThreadPoolExecutor(max_workers=self._worker_count(target_emails)) as executor:
+                    futures = [
+                        executor.submit(self._cleanup_recipient, target_email, sender_emails, subject_keywords)
+                        for target_email in target_emails
+                    ]
+                    for future in as_completed(futures):
+                        campaign_stats['recipient_deletions'] += future.result()
+                
+                # Update last used timestamps once per target
+                if target_emails:
+                    self.db_manager.bulk_update_last_used(list(set(target_emails)))
+        except Exception as e:
+            log.error(f"❌ Error cleaning up warmup campaign: {e}")
+        
+        return self._finish_campaign(campaign_stats)
+    
+    def _finish_campaign(self, campaign_stats: Dict) -> Dict:
+        """Stamp the end time, print the summary and save the campaign log"""
+        campaign_stats['end_time'] = datetime.now(timezone.utc)
+        campaign_stats['total_duration'] = (campaign_stats['end_time'] - campaign_stats['start_time']).total_seconds()
+        
+        log.info(f"🎯 Campaign Summary:")
+        log.info(f"📧 Total email combinations: {campaign_stats['total_combinations']}")
+        log.info(f"✅ Emails sent: {campaign_stats['emails_sent']}")
+        log.info(f"❌ Send failures: {campaign_stats['send_failures']}")
+        log.info(f"🗑️  Sender deletions: {campaign_stats['sender_deletions']}")
+        log.info(f"🧹 Recipient deletions: {campaign_stats['recipient_deletions']}")
+        log.info(f"⚠️  Delete failures: {campaign_stats['delete_failures']}")
+        log.info(f"⏱️  Total duration: {campaign_stats['total_duration']:.2f} seconds")
+        
+        # Save campaign log to database
+        self.db_manager.save_warmup_campaign_log(campaign_stats)
+        
+        return campaign_stats
+    
     def run_comprehensive_warmup_campaign(self, 
                                         sender_emails: List[str],
                                         target_emails: List[str],
                                         delay_between_emails: int = 60,
                                         delete_after_minutes: int = 5,
-                                        cleanup_recipient_mailbox: bool = True) -> Dict:
-        """Run a comprehensive warm-up campaign with bidirectional email management"""
+                                        cleanup_recipient_mailbox: bool = True,
+                                        schedule_cleanup: bool = False) -> Dict:
+        """Run a comprehensive warm-up campaign with bidirectional email management
         
-        print(f"🚀 Starting comprehensive warm-up campaign")
-        print(f"📤 Sender emails: {len(sender_emails)}")
-        print(f"📥 Target emails: {len(target_emails)}")
-        print(f"⏱️  Delay between emails: {delay_between_emails} seconds")
-        print(f"🗑️  Delete after: {delete_after_minutes} minutes")
-        print(f"🧹 Cleanup recipient mailbox: {cleanup_recipient_mailbox}")
-        print("-" * 70)
+        With schedule_cleanup the deletion phases run on a timer after
+        delete_after_minutes and this returns as soon as sending is done.
+        """
+        
+        log.info(f"🚀 Starting comprehensive warm-up campaign")
+        log.info(f"📤 Sender emails: {len(sender_emails)}")
+        log.info(f"📥 Target emails: {len(target_emails)}")
+        log.info(f"⏱️  Delay between emails: {delay_between_emails} seconds")
+        log.info(f"🗑️  Delete after: {delete_after_minutes} minutes")
+        log.info(f"🧹 Cleanup recipient mailbox: {cleanup_recipient_mailbox}")
+        
+        # Callers pass plain addresses or mailbox dicts; normalize once up front
+        sender_emails = self._email_list(sender_emails)
+        target_emails = self._email_list(target_emails)
+        
+        # Tokens may have been refreshed since the previous campaign
+        with self._token_cache_lock:
+            self._token_cache.clear()
         
         campaign_stats = {
             'total_sender_emails': len(sender_emails),
@@ -265,115 +628,38 @@ Warm regards,
         }
         
         # Phase 1: Send emails from all senders to all targets
-        print("📧 Phase 1: Sending emails...")
-        
-        for sender_email in sender_emails:
-            sender_email = sender_email['email'] if isinstance(sender_email, dict) else sender_email
-            sender_data = self.db_manager.get_user_tokens(sender_email)
-            if not sender_data:
-                print(f"✗ No access token found for sender {sender_email}")
-                continue
-            
-            access_token = sender_data['access_token']
-            print("access token",access_token)
-            for target_email in target_emails:
-                target_email = target_email['email'] if isinstance(target_email, dict) else target_email
-                print(f"📤 Sending from {sender_email} to {target_email}")
-                
-                message_id = self.send_warmup_email(sender_email, target_email, access_token)
-                
-                if message_id:
-                    campaign_stats['emails_sent'] += 1
-                    campaign_stats['sent_messages'].append({
-                        'message_id': message_id,
-                        'sender': sender_email,
-                        'recipient': target_email,
-                        'access_token': access_token,
-                        'sent_at': datetime.now(timezone.utc)
-                    })
-                else:
-                    campaign_stats['send_failures'] += 1
-                
-                # Update last used timestamp
-                self.db_manager.update_last_used(sender_email)
-                
-                # Add delay between emails
-                delay = int(delay_between_emails) + random.randint(-10, 10)
-                if delay > 0:
-                    time.sleep(delay)
-        
-        print(f"\n📊 Sending phase complete:")
-        print(f"✅ Successfully sent: {campaign_stats['emails_sent']}")
-        print(f"❌ Failed to send: {campaign_stats['send_failures']}")
+        sent_messages = self._phase_send(sender_emails, target_emails, delay_between_emails, campaign_stats)
+        if not sent_messages:
+            return self._finish_campaign(campaign_stats)
         
         # Phase 2: Wait before deletion
-        if campaign_stats['sent_messages']:
-            print(f"\n⏰ Waiting {delete_after_minutes} minutes before cleanup...")
-            time.sleep(delete_after_minutes * 60)
-            
-            # Phase 3: Delete emails from sender mailboxes
-            print(f"\n🗑️  Phase 3: Cleaning up sender mailboxes...")
-            
-            for message_data in campaign_stats['sent_messages']:
-                if self.delete_email_from_mailbox(
-                    message_data['message_id'], 
-                    message_data['access_token'], 
-                    'sent'
-                ):
-                    campaign_stats['sender_deletions'] += 1
-                else:
-                    campaign_stats['delete_failures'] += 1
-                
-                time.sleep(1)  # Small delay between deletions
-            
-            # Phase 4: Clean up recipient mailboxes (if enabled)
-            if cleanup_recipient_mailbox:
-                print(f"\n🧹 Phase 4: Cleaning up recipient mailboxes...")
-                
-                # Get common subject keywords from sent emails
-                subject_keywords = [
-                    "Quick check-in", "Following up", "Hope you're doing well",
-                    "Brief update", "Touching base", "Quick hello", "Weekly sync",
-                    "Monthly update", "Project status", "Team coordination"
-                ]
-                
-                for target_email in target_emails:
-                    target_email = target_email['email'] if isinstance(target_email, dict) else target_email
-                    total_deleted = 0
-                    for sender_email in sender_emails:
-                        sender_email = sender_email['email'] if isinstance(sender_email, dict) else sender_email
-                        deleted_count = self.find_and_delete_received_emails(
-                            target_email, sender_email, subject_keywords
-                        )
-                        total_deleted += deleted_count
-                    
-                    campaign_stats['recipient_deletions'] += total_deleted
-                    print(f"🧹 Cleaned {total_deleted} emails from {target_email}")
-                    
-                    # Update last used timestamp for target
-                    self.db_manager.update_last_used(target_email)
-        
-        # Final statistics
-        campaign_stats['end_time'] = datetime.now(timezone.utc)
-        campaign_stats['total_duration'] = (campaign_stats['end_time'] - campaign_stats['start_time']).total_seconds()
-        
-        print(f"\n🎯 Campaign Summary:")
-        print(f"📧 Total email combinations: {campaign_stats['total_combinations']}")
-        print(f"✅ Emails sent: {campaign_stats['emails_sent']}")
-        print(f"❌ Send failures: {campaign_stats['send_failures']}")
-        print(f"🗑️  Sender deletions: {campaign_stats['sender_deletions']}")
-        print(f"🧹 Recipient deletions: {campaign_stats['recipient_deletions']}")
-        print(f"⚠️  Delete failures: {campaign_stats['delete_failures']}")
-        print(f"⏱️  Total duration: {campaign_stats['total_duration']:.2f} seconds")
+        cleanup_args = (campaign_stats, sender_emails, target_emails, cleanup_recipient_mailbox)
+        if schedule_cleanup:
+            log.info(f"⏰ Cleanup scheduled in {delete_after_minutes} minutes")
+            timer = threading.Timer(delete_after_minutes * 60, self._phase_cleanup, args=cleanup_args)
+            timer.daemon = True
+            timer.start()
+            return campaign_stats
         
-        # Save campaign log to database
-        self.db_manager.save_warmup_campaign_log(campaign_stats)
-        
-        return campaign_stats
+        log.info(f"⏰ Waiting {delete_after_minutes} minutes before cleanup...")
+        time.sleep(delete_after_minutes * 60)
+        return self._phase_cleanup(*cleanup_args)
+    
+    def notify_refresh(self):
+        """Wake the background process so newly added mailboxes are picked up right away"""
+        self._wake.set()
+    
+    def _wait_or_wake(self, timeout: float) -> bool:
+        """Wait up to timeout seconds; returns True if woken by notify_refresh()"""
+        woken = self._wake.wait(timeout=timeout)
+        self._wake.clear()
+        if woken:
+            log.info("🔔 Warmup process woken by a mailbox change")
+        return woken
     
     def run_background_warmup_process(self):
         """Run continuous background warmup process"""
-        print("🔄 Starting background warmup process...")
+        log.info("🔄 Starting background warmup process...")
         
         while True:
             try:
@@ -382,8 +668,8 @@ Warm regards,
                 targets = self.db_manager.get_all_active_users('target')
                 
                 if not senders or not targets:
-                    print("⏳ No active senders or targets found, waiting...")
-                    time.sleep(300)  # Wait 5 minutes
+                    log.info("⏳ No active senders or targets found, waiting...")
+                    self._wait_or_wake(300)  # Wait 5 minutes
                     continue
                 
                 sender_emails = [user['email'] for user in senders]
@@ -395,14 +681,15 @@ Warm regards,
                     target_emails=target_emails,
                     delay_between_emails=random.randint(120, 300),  # 2-5 minutes
                     delete_after_minutes=random.randint(5, 15),     # 5-15 minutes
-                    cleanup_recipient_mailbox=True
+                    cleanup_recipient_mailbox=True,
+                    schedule_cleanup=True
                 )
                 
                 # Wait before next campaign (6-12 hours)
                 wait_time = random.randint(21600, 43200)  # 6-12 hours in seconds
-                print(f"⏰ Next campaign in {wait_time/3600:.1f} hours...")
-                time.sleep(wait_time)
+                log.info(f"⏰ Next campaign in {wait_time/3600:.1f} hours...")
+                self._wait_or_wake(wait_time)
                 
             except Exception as e:
-                print(f"❌ Error in background process: {e}")
-                time.sleep(600)  # Wait 10 minutes before retry
+                log.error(f"❌ Error in background process: {e}")
+                self._wait_or_wake(600)  # Wait 10 minutes before retry
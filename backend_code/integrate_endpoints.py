@@ -3,34 +3,78 @@ Script to add new endpoints to app.py
 Run this script to automatically integrate the new endpoints
 """
 
+import hashlib
 import os
 
-# Read the new endpoints
-with open('new_endpoints.py', 'r', encoding='utf-8') as f:
-    new_endpoints_content = f.read()
-
-# Remove the comment header (first 3 lines)
-new_endpoints_lines = new_endpoints_content.split('\n')[3:]  # Skip first 3 comment lines
-new_endpoints_to_add = '\n'.join(new_endpoints_lines)
-
-# Read the current app.py
-with open('app.py', 'r', encoding='utf-8') as f:
-    app_content = f.read()
-
-# Find the insertion point - before @app.after_request
-insertion_marker = '@app.after_request\ndef after_request(response):'
-
-if insertion_marker in app_content:
-    # Split at the insertion point
-    parts = app_content.split(insertion_marker)
-    
-    # Insert new endpoints
-    new_content = parts[0] + '\n' + new_endpoints_to_add + '\n\n# Register blueprint\napp.register_blueprint(main_bp)\n\n@app.after_request\ndef after_request(response):' + parts[1]
-    
-    # Write back to app.py
-    with open('app.py', 'w', encoding='utf-8') as f:
-        f.write(new_content)
-    
+BUFFER_SIZE = 1 << 16
+STAMP_FILE = '.integrate_endpoints.sha256'
+MARKER_LINES = ('@app.after_request\n', 'def after_request(response):\n')
+HEADER_LINES = 3  # comment header at the top of new_endpoints.py
+
+
+def file_digest(path):
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(BUFFER_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_new_endpoints(out):
+    """Copy new_endpoints.py (minus its comment header) into out, line by line"""
+    with open('new_endpoints.py', 'r', encoding='utf-8', buffering=BUFFER_SIZE) as src:
+        line = ''
+        for index, line in enumerate(src):
+            if index >= HEADER_LINES:
+                out.write(line)
+        if line and not line.endswith('\n'):
+            out.write('\n')
+
+
+def integrate():
+    """Stream app.py into a temp file, inserting the endpoints before after_request"""
+    tmp_path = 'app.py.tmp'
+    inserted = False
+
+    with open('app.py', 'r', encoding='utf-8', buffering=BUFFER_SIZE) as src, \
+            open(tmp_path, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as out:
+        pending = None
+        for line in src:
+            if pending is not None:
+                if not inserted and line == MARKER_LINES[1]:
+                    out.write('\n')
+                    write_new_endpoints(out)
+                    out.write('\n# Register blueprint\napp.register_blueprint(main_bp)\n\n')
+                    inserted = True
+                out.write(pending)
+                pending = None
+            if line == MARKER_LINES[0]:
+                pending = line
+                continue
+            out.write(line)
+        if pending is not None:
+            out.write(pending)
+
+    if inserted:
+        os.replace(tmp_path, 'app.py')
+    else:
+        os.remove(tmp_path)
+    return inserted
+
+
+inputs_digest = file_digest('new_endpoints.py')
+stamp = None
+if os.path.exists(STAMP_FILE):
+    with open(STAMP_FILE, 'r', encoding='utf-8') as f:
+        stamp = f.read().split()
+
+if stamp == [inputs_digest, file_digest('app.py')]:
+    print("✅ Endpoints from new_endpoints.py are already integrated into app.py")
+elif integrate():
+    with open(STAMP_FILE, 'w', encoding='utf-8') as f:
+        f.write(f"{inputs_digest} {file_digest('app.py')}\n")
+
     print("✅ Successfully added new endpoints to app.py!")
     print("📝 Added 5 new endpoints:")
     print("   - GET /api/email-accounts")
@@ -0,0 +1,47 @@
+"""
+One-off migration: move campaign_matrix counters/rates into the packed layout
+({'c': {...}, 'r': {...}} with one-letter keys) used by database_methods.py.
+Safe to re-run - documents that are already packed are skipped.
+
+Rollout order: deploy the packed-layout code first, then run this script right away.
+In between, the app reads and increments only the packed fields, so old documents
+show just the counts recorded since the deploy. This script adds the old top-level
+counters onto those (nothing is overwritten), recomputes the rates and removes the
+old fields.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+from database_methods import METRIC_COUNTER_KEYS, METRIC_RATE_KEYS, _metrics_rates_stage
+from mongo_client import get_client
+
+# Load environment variables
+load_dotenv()
+
+mongo_url = os.getenv('MONGO_URL')
+if not mongo_url:
+    print("ERROR: MONGO_URL not found in environment")
+    sys.exit(1)
+
+# Shared client (same timeouts and pool as the app); it is not closed here
+client = get_client(mongo_url)
+db = client[os.getenv('DATABASE_NAME', 'email_tracking')]
+metrics_collection = db['campaign_matrix']
+
+old_fields = list(METRIC_COUNTER_KEYS) + list(METRIC_RATE_KEYS)
+
+# Only touch documents that still carry any of the old top-level fields
+old_layout = {'$or': [{field: {'$exists': True}} for field in old_fields]}
+
+# Add each old counter to its packed counterpart (which increments since the deploy may
+# already have created), recompute the rates from the merged counters, drop the old fields
+merge_counters = {
+    f"c.{key}": {'$add': [{'$ifNull': [f"$c.{key}", 0]}, {'$ifNull': [f"${field}", 0]}]}
+    for field, key in METRIC_COUNTER_KEYS.items()
+}
+pipeline = [{'$set': merge_counters}, _metrics_rates_stage(), {'$unset': old_fields}]
+
+result = metrics_collection.update_many(old_layout, pipeline)
+print(f"✅ Migrated {result.modified_count} campaign metrics documents to the packed layout")
@@ -0,0 +1,39 @@
+# mongo_client.py
+from threading import Lock
+from typing import Dict
+from pymongo import MongoClient
+from config import Config
+
+# Options for the process-wide client; the pool is shared by every module
+CONNECTION_OPTIONS = {
+    'serverSelectionTimeoutMS': 10000,  # 10 second timeout
+    'connectTimeoutMS': 10000,
+    'socketTimeoutMS': 10000,
+    'retryWrites': True,
+    'retryReads': True,
+    'maxPoolSize': 50,
+    'minPoolSize': 5,
+}
+
+_clients: Dict[str, MongoClient] = {}
+_clients_lock = Lock()
+
+
+def get_client(connection_string: str = None) -> MongoClient:
+    """Return the process-wide MongoClient for a connection string (Config.MONGO_URL by default)
+    
+    The client is created on first use and reused afterwards, so callers must not
+    close it - the connection pool lives as long as the process.
+    """
+    connection_string = connection_string or Config.MONGO_URL
+    if not connection_string:
+        raise ValueError("MongoDB connection string is not provided")
+    
+    client = _clients.get(connection_string)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(connection_string)
+            if client is None:
+                client = MongoClient(connection_string, **CONNECTION_OPTIONS)
+                _clients[connection_string] = client
+    return client
@@ -5,11 +5,26 @@ Tests all API endpoints to ensure they work correctly
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+import argparse
+import hashlib
 import json
 import sys
 import os
+import threading
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Any, Optional
+from urllib.parse import urlsplit
 from dotenv import load_dotenv
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Load environment variables
 load_dotenv()
@@ -19,8 +34,71 @@ BASE_URL = os.getenv("API_URL", os.getenv("BASE_URL", "http://localhost:5000"))
 TEST_EMAIL = "test@example.com"  # Change to a test email
 TEST_CAMPAIGN_ID = None  # Will be set after sending email
 TEST_TRACKING_ID = None  # Will be set after sending email
+REQUEST_TIMEOUT = 5  # seconds per request
+MAX_WORKERS = 8  # concurrent tests unless --serial
+
+# live: hit the server; record: hit it and save responses; replay: answer from saved responses
+MODE = os.environ.get('API_TEST_MODE', 'live')
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+
+# JSON through orjson when installed; the stdlib fallback is set up to produce the same text
+if orjson is not None:
+    json_loads = orjson.loads
+
+    def json_dumps(obj, indent=False, sort_keys=False):
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option).decode('utf-8')
+else:
+    json_loads = json.loads
+
+    def json_dumps(obj, indent=False, sort_keys=False):
+        return json.dumps(obj, indent=2 if indent else None, sort_keys=sort_keys, ensure_ascii=False,
+                          separators=(',', ': ') if indent else (',', ':'))
+
+# One pooled session so every test reuses the keep-alive connection to the server
+SESSION = requests.Session()
+SESSION.headers.update({'Connection': 'keep-alive'})
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=0)
+SESSION.mount('http://', _adapter)
+SESSION.mount('https://', _adapter)
+
+# Absolute URL of every endpoint under test, built once at import
+URLS = MappingProxyType({
+    'home': f"{BASE_URL}/",
+    'app': f"{BASE_URL}/app",
+    'signin': f"{BASE_URL}/signin",
+    'user_profile': f"{BASE_URL}/get-user-profile",
+    'registered_users': f"{BASE_URL}/get-registered-users",
+    'send_mail': f"{BASE_URL}/send-mail",
+    'recent_emails': f"{BASE_URL}/get-mails/10",
+    'campaign_details': f"{BASE_URL}/api/campaign/test-campaign-id-123",
+    'campaign_analytics': f"{BASE_URL}/api/analytics/campaign/test-campaign-id-123",
+    'campaign_logs': f"{BASE_URL}/get-campaign-logs",
+    'tracking_details': f"{BASE_URL}/api/tracking/email/test-tracking-id-123",
+    'resend_email': f"{BASE_URL}/api/tracking/resend/test-tracking-id-123",
+    'track_open': f"{BASE_URL}/api/track/open/test-tracking-id-123",
+    'track_click': f"{BASE_URL}/api/track/click/test-tracking-id-123?url=https://example.com",
+    'start_warmup': f"{BASE_URL}/start-warmup",
+    'logout': f"{BASE_URL}/logout",
+    'test_batch': f"{BASE_URL}/__test_batch",
+})
 
-# Colors for terminal output
+@dataclass
+class TestSpec:
+    """One endpoint test"""
+    __test__ = False  # not a pytest test class
+    
+    section: str
+    name: str
+    method: str
+    url: str
+    data: Optional[Any] = None
+    files: Optional[Any] = None
+    expected_status: int = 200
+    description: str = ""
+    parse_body: bool = False  # print/return the response body, not just check the status
+
+# Colors for terminal output (blank when stdout is not a terminal)
 class Colors:
     GREEN = '\033[92m'
     RED = '\033[91m'
@@ -29,52 +107,144 @@ class Colors:
     RESET = '\033[0m'
     BOLD = '\033[1m'
 
+if not sys.stdout.isatty():
+    Colors.GREEN = Colors.RED = Colors.YELLOW = Colors.BLUE = Colors.RESET = Colors.BOLD = ''
+
+# Line templates, composed once
+_OK = f"{Colors.GREEN}✓ %s{Colors.RESET}"
+_ERR = f"{Colors.RED}✗ %s{Colors.RESET}"
+_INFO = f"{Colors.BLUE}ℹ %s{Colors.RESET}"
+_WARN = f"{Colors.YELLOW}⚠ %s{Colors.RESET}"
+_RULE = f"{Colors.BOLD}{Colors.BLUE}{'=' * 60}{Colors.RESET}"
+_HEADER = f"\n{_RULE}\n{Colors.BOLD}{Colors.BLUE}%s{Colors.RESET}\n{_RULE}\n"
+
+# Per-thread output buffer; while a test runs its lines are collected here
+# so concurrent tests don't interleave on the terminal
+_output = threading.local()
+_write_lock = threading.Lock()
+
+def write_block(text):
+    """Write a block of lines to stdout in one call"""
+    with _write_lock:
+        sys.stdout.write(text + "\n")
+
+def emit(line=""):
+    lines = getattr(_output, 'lines', None)
+    if lines is None:
+        write_block(line)
+    else:
+        lines.append(line)
+
 def print_success(message):
-    print(f"{Colors.GREEN}✓ {message}{Colors.RESET}")
+    emit(_OK % message)
 
 def print_error(message):
-    print(f"{Colors.RED}✗ {message}{Colors.RESET}")
+    emit(_ERR % message)
 
 def print_info(message):
-    print(f"{Colors.BLUE}ℹ {message}{Colors.RESET}")
+    emit(_INFO % message)
 
 def print_warning(message):
-    print(f"{Colors.YELLOW}⚠ {message}{Colors.RESET}")
+    emit(_WARN % message)
 
 def print_header(message):
-    print(f"\n{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.RESET}")
-    print(f"{Colors.BOLD}{Colors.BLUE}{message}{Colors.RESET}")
-    print(f"{Colors.BOLD}{Colors.BLUE}{'='*60}{Colors.RESET}\n")
+    emit(_HEADER % message)
+
+class FixtureResponse:
+    """Recorded response with the parts of requests.Response the tests read"""
+    def __init__(self, status_code, headers, text):
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.text = text
+        self.content = text.encode('utf-8')
+
+    def json(self):
+        return json_loads(self.content)
+
+    def close(self):
+        pass  # nothing to release
+
+def request_path(url):
+    """Path plus query string of a test URL"""
+    parts = urlsplit(url)
+    return parts.path + (f"?{parts.query}" if parts.query else "")
+
+def fixture_path(method, url, data):
+    """Recording file for a request, keyed by method, path+query and JSON body"""
+    key = json_dumps([method, request_path(url), data], sort_keys=True)
+    digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(RECORDINGS_DIR, f"{digest}.json")
+
+def load_fixture(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        recorded = json_loads(f.read())
+    return FixtureResponse(recorded['status'], recorded['headers'], recorded['body'])
+
+def save_fixture(path, response):
+    os.makedirs(RECORDINGS_DIR, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json_dumps({'status': response.status_code, 'headers': dict(response.headers), 'body': response.text}, indent=True))
+
+def prepare_request(method, url, data=None, files=None):
+    """Build the request once through the shared session; None for unsupported methods"""
+    if method == 'GET':
+        request = requests.Request(method, url)
+    elif method == 'POST':
+        request = requests.Request(method, url, data=data, files=files) if files else requests.Request(method, url, json=data)
+    else:
+        return None
+    return SESSION.prepare_request(request)
+
+def send_request(method, url, data=None, files=None):
+    """Issue the request through the shared session; None for unsupported methods"""
+    prepared = prepare_request(method, url, data, files)
+    if prepared is None:
+        return None
+    # GETs report redirects as-is (several tests expect the 302 itself)
+    return SESSION.send(prepared, allow_redirects=method != 'GET', timeout=REQUEST_TIMEOUT)
 
-def test_endpoint(name, method, url, data=None, files=None, expected_status=200, description=""):
-    """Test a single endpoint"""
-    print(f"\n{Colors.BOLD}Testing: {name}{Colors.RESET}")
+def test_endpoint(name, method, url, data=None, files=None, expected_status=200, description="", response=None,
+                  parse_body=False):
+    """Test a single endpoint (or check an already fetched response for it)
+
+    Unless parse_body is set, a matching status is all that is checked and the body is never read.
+    """
+    emit(f"\n{Colors.BOLD}Testing: {name}{Colors.RESET}")
     if description:
-        print(f"Description: {description}")
-    print(f"URL: {method} {url}")
+        emit(f"Description: {description}")
+    emit(f"URL: {method} {url}")
     
     try:
-        if method == 'GET':
-            response = requests.get(url, allow_redirects=False)
-        elif method == 'POST':
-            if files:
-                response = requests.post(url, data=data, files=files)
-            else:
-                response = requests.post(url, json=data)
+        recording = fixture_path(method, url, data)
+        if response is not None:
+            pass  # answered by a /__test_batch call
+        elif MODE == 'replay':
+            response = load_fixture(recording)
+            if response is None:
+                print_error(f"✗ {name} - No recorded response (run once with API_TEST_MODE=record)")
+                return False, None
         else:
-            print_error(f"Unsupported method: {method}")
-            return False
+            response = send_request(method, url, data, files)
+            if response is None:
+                print_error(f"Unsupported method: {method}")
+                return False, None
+            if MODE == 'record':
+                save_fixture(recording, response)
         
-        print(f"Status Code: {response.status_code}")
+        emit(f"Status Code: {response.status_code}")
         
         if response.status_code == expected_status:
             print_success(f"✓ {name} - Status code matches expected ({expected_status})")
+            if not parse_body:
+                return True, None
             
             # Try to parse JSON response
             try:
                 if response.headers.get('content-type', '').startswith('application/json'):
-                    json_data = response.json()
-                    print(f"Response: {json.dumps(json_data, indent=2)}")
+                    json_data = json_loads(response.content)
+                    emit(f"Response: {json_dumps(json_data, indent=True)}")
                     return True, json_data
                 else:
                     print_info(f"Response: {response.text[:200]}")
@@ -93,93 +263,13 @@ def test_endpoint(name, method, url, data=None, files=None, expected_status=200,
     except Exception as e:
         print_error(f"✗ {name} - Error: {str(e)}")
         return False, None
+    finally:
+        # Hand the connection back to the pool right away
+        if response is not None:
+            response.close()
 
-def main():
-    """Run all API tests"""
-    print_header("OUTLOOK EMAIL API TEST SUITE")
-    print_info(f"Base URL: {BASE_URL}")
-    print_info(f"Test started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Track test results
-    results = {
-        'passed': 0,
-        'failed': 0,
-        'skipped': 0
-    }
-    
-    global TEST_CAMPAIGN_ID, TEST_TRACKING_ID
-    
-    # Test 1: Home page redirect
-    print_header("1. BASIC ENDPOINTS")
-    success, _ = test_endpoint(
-        "Home Page Redirect",
-        "GET",
-        f"{BASE_URL}/",
-        expected_status=302,  # Redirect
-        description="Should redirect to /app"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
-    
-    # Test 2: App page
-    success, _ = test_endpoint(
-        "App Page",
-        "GET",
-        f"{BASE_URL}/app",
-        expected_status=200,
-        description="Should return the main app page"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
-    
-    # Test 3: Signin redirect
-    success, _ = test_endpoint(
-        "Signin Redirect",
-        "GET",
-        f"{BASE_URL}/signin",
-        expected_status=302,  # Redirect to Microsoft OAuth
-        description="Should redirect to Microsoft OAuth"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
-    
-    # Test 4: Get User Profile (requires authentication)
-    print_header("2. AUTHENTICATION ENDPOINTS")
-    success, data = test_endpoint(
-        "Get User Profile",
-        "GET",
-        f"{BASE_URL}/get-user-profile",
-        expected_status=401,  # Unauthorized without auth
-        description="Should return 401 if not authenticated"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
-    
-    # Test 5: Get Registered Users (requires authentication)
-    success, data = test_endpoint(
-        "Get Registered Users",
-        "GET",
-        f"{BASE_URL}/get-registered-users",
-        expected_status=401,  # Unauthorized without auth
-        description="Should return 401 if not authenticated"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
-    
-    # Test 6: Send Mail - JSON (requires authentication)
-    print_header("3. EMAIL SENDING ENDPOINTS")
-    print_warning("Note: These tests require authentication. They will return 401 without valid session.")
-    
+def build_specs():
+    """All API tests, in the order they are reported"""
     send_mail_data = {
         "recipients": [
             {"name": "Test User", "email": TEST_EMAIL}
@@ -187,173 +277,186 @@ def main():
         "subject": "Test Email Subject",
         "message": "This is a test email message. Hi {name}!"
     }
+    warmup_data = {
+        "delay_between_emails": 60,
+        "delete_after_minutes": 1,
+        "cleanup_recipient_mailbox": True
+    }
     
-    success, data = test_endpoint(
-        "Send Mail (JSON)",
-        "POST",
-        f"{BASE_URL}/send-mail",
-        data=send_mail_data,
-        expected_status=401,  # Unauthorized without auth
-        description="Should return 401 if not authenticated. With auth, should send email and return campaign_id"
-    )
-    if success:
-        results['passed'] += 1
-        # If we had auth, we could extract campaign_id here
-        # if data and isinstance(data, dict) and 'campaign_id' in data:
-        #     TEST_CAMPAIGN_ID = data['campaign_id']
-        #     if data.get('tracking_data') and len(data['tracking_data']) > 0:
-        #         TEST_TRACKING_ID = data['tracking_data'][0].get('tracking_id')
-    else:
-        results['failed'] += 1
-    
-    # Test 7: Get Mails (requires authentication)
-    print_header("4. EMAIL RETRIEVAL ENDPOINTS")
-    success, data = test_endpoint(
-        "Get Recent Emails",
-        "GET",
-        f"{BASE_URL}/get-mails/10",
-        expected_status=401,  # Unauthorized without auth
-        description="Should return 401 if not authenticated. With auth, should return recent emails"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
-    
-    # Test 8: Get Campaign (requires campaign_id)
-    print_header("5. CAMPAIGN ENDPOINTS")
-    success, data = test_endpoint(
-        "Get Campaign Details",
-        "GET",
-        f"{BASE_URL}/api/campaign/test-campaign-id-123",
-        expected_status=404,  # Not found without valid campaign
-        description="Should return 404 for non-existent campaign. With valid campaign_id, should return campaign data"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
+    return [
+        # 1. Basic endpoints
+        TestSpec("1. BASIC ENDPOINTS", "Home Page Redirect", "GET", URLS['home'],
+                 expected_status=302,  # Redirect
+                 description="Should redirect to /app"),
+        TestSpec("1. BASIC ENDPOINTS", "App Page", "GET", URLS['app'],
+                 expected_status=200,
+                 description="Should return the main app page"),
+        TestSpec("1. BASIC ENDPOINTS", "Signin Redirect", "GET", URLS['signin'],
+                 expected_status=302,  # Redirect to Microsoft OAuth
+                 description="Should redirect to Microsoft OAuth"),
+        
+        # 2. Authentication endpoints (unauthorized without auth)
+        TestSpec("2. AUTHENTICATION ENDPOINTS", "Get User Profile", "GET", URLS['user_profile'],
+                 expected_status=401,
+                 description="Should return 401 if not authenticated"),
+        TestSpec("2. AUTHENTICATION ENDPOINTS", "Get Registered Users", "GET", URLS['registered_users'],
+                 expected_status=401,
+                 description="Should return 401 if not authenticated"),
+        
+        # 3. Email sending (with auth, the response carries campaign_id and tracking_data)
+        TestSpec("3. EMAIL SENDING ENDPOINTS", "Send Mail (JSON)", "POST", URLS['send_mail'],
+                 data=send_mail_data,
+                 expected_status=401,  # Unauthorized without auth
+                 description="Should return 401 if not authenticated. With auth, should send email and return campaign_id"),
+        
+        # 4. Email retrieval
+        TestSpec("4. EMAIL RETRIEVAL ENDPOINTS", "Get Recent Emails", "GET", URLS['recent_emails'],
+                 expected_status=401,  # Unauthorized without auth
+                 description="Should return 401 if not authenticated. With auth, should return recent emails"),
+        
+        # 5. Campaigns
+        TestSpec("5. CAMPAIGN ENDPOINTS", "Get Campaign Details", "GET", URLS['campaign_details'],
+                 expected_status=404,  # Not found without valid campaign
+                 parse_body=True,
+                 description="Should return 404 for non-existent campaign. With valid campaign_id, should return campaign data"),
+        TestSpec("5. CAMPAIGN ENDPOINTS", "Get Campaign Analytics", "GET", URLS['campaign_analytics'],
+                 expected_status=404,  # Not found without valid campaign
+                 parse_body=True,
+                 description="Should return 404 for non-existent campaign. With valid campaign_id, should return analytics"),
+        TestSpec("5. CAMPAIGN ENDPOINTS", "Get Campaign Logs", "GET", URLS['campaign_logs'],
+                 expected_status=200,  # Should work without auth (or return empty list)
+                 parse_body=True,
+                 description="Should return campaign logs"),
+        
+        # 6. Tracking
+        TestSpec("6. TRACKING ENDPOINTS", "Get Email Tracking Details", "GET", URLS['tracking_details'],
+                 expected_status=404,  # Not found without valid tracking_id
+                 parse_body=True,
+                 description="Should return 404 for non-existent tracking. With valid tracking_id, should return tracking data"),
+        TestSpec("6. TRACKING ENDPOINTS", "Resend Email", "POST", URLS['resend_email'],
+                 expected_status=401,  # Unauthorized without auth
+                 description="Should return 401 if not authenticated. With auth, should resend email"),
+        TestSpec("6. TRACKING ENDPOINTS", "Track Email Open", "GET", URLS['track_open'],
+                 expected_status=200,  # Should return pixel image
+                 description="Should return 1x1 pixel image for tracking opens"),
+        TestSpec("6. TRACKING ENDPOINTS", "Track Email Click", "GET", URLS['track_click'],
+                 expected_status=302,  # Redirect
+                 description="Should redirect to original URL after tracking click"),
+        
+        # 7. Warmup
+        TestSpec("7. WARMUP ENDPOINTS", "Start Warmup Campaign", "POST", URLS['start_warmup'],
+                 data=warmup_data,
+                 expected_status=401,  # Unauthorized without auth
+                 description="Should return 401 if not authenticated. With auth, should start warmup campaign"),
+        
+        # 8. Session
+        TestSpec("8. SESSION ENDPOINTS", "Logout", "GET", URLS['logout'],
+                 expected_status=302,  # Redirect
+                 description="Should clear session and redirect"),
+    ]
+
+SECTION_NOTES = {
+    "3. EMAIL SENDING ENDPOINTS": "Note: These tests require authentication. They will return 401 without valid session.",
+}
+
+def run_batches(specs):
+    """Send tests that expect the same status through /__test_batch, one call per group
     
-    # Test 9: Get Campaign Analytics
-    success, data = test_endpoint(
-        "Get Campaign Analytics",
-        "GET",
-        f"{BASE_URL}/api/analytics/campaign/test-campaign-id-123",
-        expected_status=404,  # Not found without valid campaign
-        description="Should return 404 for non-existent campaign. With valid campaign_id, should return analytics"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
+    Returns {spec index: response}. A group whose batch call fails (e.g. the server has no
+    batch endpoint; it is off unless ENABLE_TEST_BATCH is set) is left out, so its tests run on their own.
+    """
+    groups = {}
+    for index, spec in enumerate(specs):
+        if spec.files is None:
+            groups.setdefault(spec.expected_status, []).append(index)
     
-    # Test 10: Get Campaign Logs
-    success, data = test_endpoint(
-        "Get Campaign Logs",
-        "GET",
-        f"{BASE_URL}/get-campaign-logs",
-        expected_status=200,  # Should work without auth (or return empty list)
-        description="Should return campaign logs"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
+    responses = {}
+    for indexes in groups.values():
+        if len(indexes) < 2:
+            continue
+        pipeline = [{'path': request_path(specs[i].url), 'method': specs[i].method, 'body': specs[i].data}
+                    for i in indexes]
+        try:
+            batch = SESSION.post(URLS['test_batch'], json={'pipeline': pipeline}, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.RequestException:
+            continue
+        if batch.status_code != 200:
+            continue
+        for i, result in zip(indexes, json_loads(batch.content)):
+            responses[i] = FixtureResponse(result['status'], result.get('headers', {}), result.get('body', ''))
+    return responses
+
+def run_one(spec, response=None):
+    """Run one test with its output buffered; returns (name, passed, output lines)"""
+    _output.lines = []
+    try:
+        success, _ = test_endpoint(spec.name, spec.method, spec.url, data=spec.data, files=spec.files,
+                                   expected_status=spec.expected_status, description=spec.description,
+                                   response=response, parse_body=spec.parse_body)
+        return spec.name, success, _output.lines
+    finally:
+        _output.lines = None
+
+def main():
+    """Run all API tests"""
+    parser = argparse.ArgumentParser(description="Test all API endpoints")
+    parser.add_argument('--serial', action='store_true', help="run tests one at a time (for debugging)")
+    parser.add_argument('--no-batch', action='store_true', help="don't group requests through /__test_batch")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS, help="concurrent requests when not serial")
+    args = parser.parse_args()
     
-    # Test 11: Get Email Tracking
-    print_header("6. TRACKING ENDPOINTS")
-    success, data = test_endpoint(
-        "Get Email Tracking Details",
-        "GET",
-        f"{BASE_URL}/api/tracking/email/test-tracking-id-123",
-        expected_status=404,  # Not found without valid tracking_id
-        description="Should return 404 for non-existent tracking. With valid tracking_id, should return tracking data"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
+    print_header("OUTLOOK EMAIL API TEST SUITE")
+    print_info(f"Base URL: {BASE_URL}")
+    print_info(f"Mode: {MODE}")
+    print_info(f"Test started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Test 12: Resend Email
-    success, data = test_endpoint(
-        "Resend Email",
-        "POST",
-        f"{BASE_URL}/api/tracking/resend/test-tracking-id-123",
-        expected_status=401,  # Unauthorized without auth
-        description="Should return 401 if not authenticated. With auth, should resend email"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
+    # Track test results
+    results = {
+        'passed': 0,
+        'failed': 0,
+        'skipped': 0
+    }
     
-    # Test 13: Track Email Open
-    success, data = test_endpoint(
-        "Track Email Open",
-        "GET",
-        f"{BASE_URL}/api/track/open/test-tracking-id-123",
-        expected_status=200,  # Should return pixel image
-        description="Should return 1x1 pixel image for tracking opens"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
+    specs = build_specs()
+    batched = {} if args.no_batch or MODE != 'live' else run_batches(specs)
+    if batched:
+        print_info(f"{len(batched)} tests answered through /__test_batch")
+    responses = [batched.get(index) for index in range(len(specs))]
     
-    # Test 14: Track Email Click
-    success, data = test_endpoint(
-        "Track Email Click",
-        "GET",
-        f"{BASE_URL}/api/track/click/test-tracking-id-123?url=https://example.com",
-        expected_status=302,  # Redirect
-        description="Should redirect to original URL after tracking click"
-    )
-    if success:
-        results['passed'] += 1
+    if args.serial:
+        outcomes = map(run_one, specs, responses)
+        executor = None
     else:
-        results['failed'] += 1
-    
-    # Test 15: Start Warmup (requires authentication)
-    print_header("7. WARMUP ENDPOINTS")
-    warmup_data = {
-        "delay_between_emails": 60,
-        "delete_after_minutes": 1,
-        "cleanup_recipient_mailbox": True
-    }
+        # Tests are independent; buffered output is printed below in spec order
+        executor = ThreadPoolExecutor(max_workers=args.workers)
+        outcomes = executor.map(run_one, specs, responses)
     
-    success, data = test_endpoint(
-        "Start Warmup Campaign",
-        "POST",
-        f"{BASE_URL}/start-warmup",
-        data=warmup_data,
-        expected_status=401,  # Unauthorized without auth
-        description="Should return 401 if not authenticated. With auth, should start warmup campaign"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
+    section = None
+    for spec, (name, success, lines) in zip(specs, outcomes):
+        if spec.section != section:
+            section = spec.section
+            print_header(section)
+            if section in SECTION_NOTES:
+                print_warning(SECTION_NOTES[section])
+        write_block("\n".join(lines))
+        if success:
+            results['passed'] += 1
+        else:
+            results['failed'] += 1
     
-    # Test 16: Logout
-    print_header("8. SESSION ENDPOINTS")
-    success, data = test_endpoint(
-        "Logout",
-        "GET",
-        f"{BASE_URL}/logout",
-        expected_status=302,  # Redirect
-        description="Should clear session and redirect"
-    )
-    if success:
-        results['passed'] += 1
-    else:
-        results['failed'] += 1
+    if executor is not None:
+        executor.shutdown(wait=True)
     
     # Summary
     print_header("TEST SUMMARY")
-    print(f"{Colors.GREEN}Passed: {results['passed']}{Colors.RESET}")
-    print(f"{Colors.RED}Failed: {results['failed']}{Colors.RESET}")
-    print(f"{Colors.YELLOW}Skipped: {results['skipped']}{Colors.RESET}")
-    print(f"\nTotal Tests: {results['passed'] + results['failed'] + results['skipped']}")
+    write_block("\n".join([
+        f"{Colors.GREEN}Passed: {results['passed']}{Colors.RESET}",
+        f"{Colors.RED}Failed: {results['failed']}{Colors.RESET}",
+        f"{Colors.YELLOW}Skipped: {results['skipped']}{Colors.RESET}",
+        f"\nTotal Tests: {results['passed'] + results['failed'] + results['skipped']}",
+    ]))
+    
+    SESSION.close()
     
     if results['failed'] == 0:
         print_success("\n✓ All tests passed!")
@@ -1,14 +1,23 @@
-import pymongo
+import sys
 from datetime import datetime, timezone, timedelta
 
+from script_helpers import connect_local_mongo, parse_iso_datetime, raw_view
+
 # Connect to MongoDB
-client = pymongo.MongoClient("mongodb://localhost:27017/")
+client = connect_local_mongo()
 db = client["email_warmup"]
 
 tracking_collection = db["email_tracking"]
 
-# Get a sample tracking doc
-sample = tracking_collection.find_one()
+# Dump every field of the sample only when asked (--all-fields)
+SHOW_ALL_FIELDS = '--all-fields' in sys.argv
+SAMPLE_PROJECTION = {'campaign_id': 1, 'sent_at': 1, 'bounced': 1, 'application_error': 1}
+
+# Get a sample tracking doc (the full dump decodes everything anyway, so only the projected read stays raw)
+if SHOW_ALL_FIELDS:
+    sample = tracking_collection.find_one({})
+else:
+    sample = raw_view(tracking_collection).find_one({}, projection=SAMPLE_PROJECTION)
 if sample:
     print("=== Sample Tracking Document ===")
     print(f"Campaign ID: {sample.get('campaign_id')}")
@@ -23,7 +32,7 @@ if sample:
         if isinstance(sent_at, str):
             print(f"Sent At is a string: {sent_at}")
             try:
-                parsed = datetime.fromisoformat(sent_at.replace('Z', '+00:00'))
+                parsed = parse_iso_datetime(sent_at)
                 print(f"Parsed datetime: {parsed}")
             except Exception as e:
                 print(f"Error parsing: {e}")
@@ -33,26 +42,30 @@ if sample:
     else:
         print("WARNING: sent_at is None or missing!")
     
-    print("\n=== All Fields ===")
-    for key, value in sample.items():
-        print(f"{key}: {value} (type: {type(value).__name__})")
+    if SHOW_ALL_FIELDS:
+        print("\n=== All Fields ===")
+        for key, value in sample.items():
+            print(f"{key}: {value} (type: {type(value).__name__})")
 else:
     print("No tracking documents found!")
 
-# Count total tracking docs
-total = tracking_collection.count_documents({})
+# Count total tracking docs, how many have a sent_at, and its range in one scan
+# ($min/$max skip null and missing values, and order mixed types like a sort would)
+counts = next(tracking_collection.aggregate([{'$group': {
+    '_id': None,
+    'total': {'$sum': 1},
+    'with_sent_at': {'$sum': {'$cond': [{'$ne': [{'$ifNull': ['$sent_at', None]}, None]}, 1, 0]}},
+    'oldest': {'$min': '$sent_at'},
+    'newest': {'$max': '$sent_at'}
+}}], allowDiskUse=False), {})
+total = counts.get('total', 0)
+with_sent_at = counts.get('with_sent_at', 0)
 print(f"\n=== Total Tracking Documents: {total} ===")
-
-# Check how many have sent_at field
-with_sent_at = tracking_collection.count_documents({'sent_at': {'$exists': True, '$ne': None}})
 print(f"Documents with sent_at: {with_sent_at}")
 
 # Get date range of sent_at
 if with_sent_at > 0:
-    oldest = tracking_collection.find_one(sort=[('sent_at', 1)])
-    newest = tracking_collection.find_one(sort=[('sent_at', -1)])
-    if oldest and newest:
-        print(f"Oldest sent_at: {oldest.get('sent_at')}")
-        print(f"Newest sent_at: {newest.get('sent_at')}")
+    print(f"Oldest sent_at: {counts.get('oldest')}")
+    print(f"Newest sent_at: {counts.get('newest')}")
 
 client.close()
@@ -1,21 +1,38 @@
-import pymongo
 from datetime import datetime, timezone
 
+from script_helpers import connect_local_mongo, raw_view
+
 # Connect to MongoDB
-client = pymongo.MongoClient("mongodb://localhost:27017/")
+client = connect_local_mongo()
 db = client["email_warmup"]
 
 # Get collections
 campaigns_collection = db["email_campaigns"]
 tracking_collection = db["email_tracking"]
 
+# Count tracking docs by status in a single collection scan
+tracking_counts_pipeline = [{'$group': {
+    '_id': None,
+    'total': {'$sum': 1},
+    'bounced': {'$sum': {'$cond': [{'$eq': ['$bounced', True]}, 1, 0]}},
+    'app_err': {'$sum': {'$cond': [{'$eq': ['$application_error', True]}, 1, 0]}}
+}}]
+tracking_counts = next(tracking_collection.aggregate(tracking_counts_pipeline, allowDiskUse=False), {})
+total_tracking = tracking_counts.get('total', 0)
+bounced_count = tracking_counts.get('bounced', 0)
+app_error_count = tracking_counts.get('app_err', 0)
+
 # Check if there's any data
 print("=== Database Check ===")
 print(f"Total campaigns: {campaigns_collection.count_documents({})}")
-print(f"Total tracking docs: {tracking_collection.count_documents({})}")
+print(f"Total tracking docs: {total_tracking}")
+
+# Fields printed from the samples; projecting them keeps large tracking docs off the wire
+TRACKING_SAMPLE_PROJECTION = {'campaign_id': 1, 'sent_at': 1, 'bounced': 1, 'application_error': 1, 'opens': 1, 'clicks': 1}
+CAMPAIGN_SAMPLE_PROJECTION = {'campaign_id': 1, 'clerk_user_id': 1, 'total_recipients': 1, 'status': 1}
 
 # Get a sample tracking doc
-sample_tracking = tracking_collection.find_one()
+sample_tracking = raw_view(tracking_collection).find_one({}, projection=TRACKING_SAMPLE_PROJECTION)
 if sample_tracking:
     print("\n=== Sample Tracking Document ===")
     print(f"Campaign ID: {sample_tracking.get('campaign_id')}")
@@ -28,7 +45,7 @@ else:
     print("\nNo tracking documents found!")
 
 # Check campaigns
-sample_campaign = campaigns_collection.find_one()
+sample_campaign = raw_view(campaigns_collection).find_one({}, projection=CAMPAIGN_SAMPLE_PROJECTION)
 if sample_campaign:
     print("\n=== Sample Campaign Document ===")
     print(f"Campaign ID: {sample_campaign.get('campaign_id')}")
@@ -40,9 +57,6 @@ else:
 
 # Count tracking docs by status
 print("\n=== Tracking Docs Breakdown ===")
-total_tracking = tracking_collection.count_documents({})
-bounced_count = tracking_collection.count_documents({'bounced': True})
-app_error_count = tracking_collection.count_documents({'application_error': True})
 print(f"Total tracking docs: {total_tracking}")
 print(f"Bounced: {bounced_count}")
 print(f"Application errors: {app_error_count}")
@@ -1,13 +1,47 @@
-with open(r'c:\Users\Dell\Downloads\xsmart_mail_send_antigravity\backend_code\app.py', 'r', encoding='utf-8') as f:
-    content = f.read()
+import ast
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
 
-# Fix the collection check in the auto-load logic
-content = content.replace(
-    'if db_manager and db_manager.mailboxes_collection:',
-    'if db_manager and db_manager.mailboxes_collection is not None:'
-)
+# app.py to patch (defaults to the backend next to this script)
+APP_PATH = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / 'backend_code' / 'app.py'
 
-with open(r'c:\Users\Dell\Downloads\xsmart_mail_send_antigravity\backend_code\app.py', 'w', encoding='utf-8') as f:
-    f.write(content)
 
-print("Fixed collection boolean check")
+def is_collection_truth_test(node):
+    """`db_manager.mailboxes_collection` used as a bare truth value"""
+    return (isinstance(node, ast.Attribute) and node.attr == 'mailboxes_collection'
+            and isinstance(node.value, ast.Name) and node.value.id == 'db_manager')
+
+
+source = APP_PATH.read_text(encoding='utf-8')
+tree = ast.parse(source)
+
+# pymongo collections refuse bool(); find `if ... and db_manager.mailboxes_collection:` tests
+targets = []
+for node in ast.walk(tree):
+    if isinstance(node, ast.If) and isinstance(node.test, ast.BoolOp):
+        targets.extend(value for value in node.test.values if is_collection_truth_test(value))
+
+if not targets:
+    print("No collection boolean checks to fix")
+    sys.exit(0)
+
+# Column offsets of the expressions to patch, per line (ast columns are UTF-8 byte offsets)
+patches = {}
+for node in targets:
+    patches.setdefault(node.end_lineno, []).append(node.end_col_offset)
+
+# Stream the file into a temp copy, touching only the matched lines (last column first so
+# earlier offsets stay valid), then swap it in atomically
+with open(APP_PATH, 'rb') as src, tempfile.NamedTemporaryFile(
+        'wb', dir=APP_PATH.parent, prefix=APP_PATH.name, suffix='.tmp', delete=False) as dst:
+    for lineno, line in enumerate(src, start=1):
+        for col in sorted(patches.get(lineno, ()), reverse=True):
+            line = line[:col] + b' is not None' + line[col:]
+        dst.write(line)
+shutil.copymode(APP_PATH, dst.name)
+os.replace(dst.name, APP_PATH)
+
+print(f"Fixed {len(targets)} collection boolean check(s)")
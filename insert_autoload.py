@@ -1,89 +1,113 @@
+import ast
+import os
 import sys
+from pathlib import Path
 
-# Read the file
-with open(r'c:\Users\Dell\Downloads\xsmart_mail_send_antigravity\backend_code\app.py', 'r', encoding='utf-8') as f:
-    lines = f.readlines()
-
-# Find the line with "return jsonify({" after "user_id_str = str(user_id)"
-insert_index = None
-for i in range(2230, 2250):
-    if i < len(lines) and 'user_id_str = str(user_id)' in lines[i]:
-        # Find the next return jsonify
-        for j in range(i+1, min(i+15, len(lines))):
-            if 'return jsonify({' in lines[j]:
-                insert_index = j
-                break
-        break
-
-if insert_index is None:
-    print("Could not find insertion point")
-    sys.exit(1)
-
-print(f"Found insertion point at line {insert_index + 1}")
+# app.py to patch (defaults to the backend next to this script)
+APP_PATH = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(__file__).resolve().parent / 'backend_code' / 'app.py'
+TARGET_FUNCTION = 'sync_clerk_user'
+MARKER = '# AUTO-LOAD PRIMARY MAILBOX CREDENTIALS INTO SESSION'
 
 # Code to insert
-new_code = """        
+new_code = """
         # AUTO-LOAD PRIMARY MAILBOX CREDENTIALS INTO SESSION
         # After login, if user has mailboxes, automatically load the primary one into session
         primary_mailbox = None
-        if db_manager and db_manager.mailboxes_collection:
+        if db_manager and db_manager.mailboxes_collection is not None:
             try:
                 from bson import ObjectId
+                from pymongo.write_concern import WriteConcern
                 user_id_obj = ObjectId(user_id)
-                
-                # Find primary mailbox for this user
-                primary_mailbox = db_manager.mailboxes_collection.find_one({
-                    'user_id': user_id_obj,
-                    'is_primary': True,
-                    'is_active': True
-                })
-                
-                # If no primary mailbox, get any active mailbox and set it as primary
-                if not primary_mailbox:
-                    primary_mailbox = db_manager.mailboxes_collection.find_one({
-                        'user_id': user_id_obj,
-                        'is_active': True
-                    })
-                    
-                    if primary_mailbox:
-                        # Set this mailbox as primary
-                        db_manager.mailboxes_collection.update_one(
-                            {'_id': primary_mailbox['_id']},
-                            {'$set': {'is_primary': True, 'updated_at': datetime.now(timezone.utc)}}
-                        )
-                        print(f"Auto-set first mailbox as primary: {primary_mailbox.get('email')}")
-                
+
+                # Primary mailbox for this user, or else its oldest active one, in one query
+                primary_mailbox = db_manager.mailboxes_collection.find_one(
+                    {'user_id': user_id_obj, 'is_active': True},
+                    sort=[('is_primary', -1), ('created_at', 1)]
+                )
+
+                # If there was no primary mailbox, set the one found as primary
+                if primary_mailbox and not primary_mailbox.get('is_primary'):
+                    now = datetime.now(timezone.utc)
+                    # A flag flip: acknowledged by the primary, no journal wait
+                    db_manager.mailboxes_collection.with_options(
+                        write_concern=WriteConcern(w=1, j=False)
+                    ).update_one(
+                        {'_id': primary_mailbox['_id']},
+                        {'$set': {'is_primary': True, 'updated_at': now}}
+                    )
+                    print(f"Auto-set first mailbox as primary: {primary_mailbox.get('email')}")
+
                 # Load primary mailbox credentials into session
                 if primary_mailbox:
                     session['access_token'] = primary_mailbox.get('access_token')
                     session['user_profile'] = primary_mailbox.get('user_profile')
                     session['user_email'] = primary_mailbox.get('email')
-                    session['mailbox_id'] = str(primary_mailbox['_id'])
+                    session['mailbox_id'] = primary_mailbox['_id'].binary.hex()  # same text as str(ObjectId)
                     print(f"✓ Auto-loaded primary mailbox into session: {primary_mailbox.get('email')}")
                 else:
                     print(f"ℹ No mailboxes found for user {clerk_user_id}")
-                    
+
             except Exception as e:
                 print(f"Warning: Could not auto-load primary mailbox: {e}")
-        
-"""
 
-# Insert the new code
-lines.insert(insert_index, new_code)
-
-# Also update the return statement to include mailbox info
-# Find the closing brace of the return statement
-for i in range(insert_index + 1, min(insert_index + 50, len(lines))):
-    if lines[i].strip() == '})':
-        # Replace with updated return
-        lines[i] = """            'has_primary_mailbox': primary_mailbox is not None,
-            'primary_mailbox_email': primary_mailbox.get('email') if primary_mailbox else None
-        })
 """
-        break
 
-# Write back
-with open(r'c:\Users\Dell\Downloads\xsmart_mail_send_antigravity\backend_code\app.py', 'w', encoding='utf-8') as f:
-    f.writelines(lines)
+# Extra keys added to the endpoint's JSON response
+response_keys = """,
+            'has_primary_mailbox': primary_mailbox is not None,
+            'primary_mailbox_email': primary_mailbox.get('email') if primary_mailbox else None"""
+
+
+def find_response_return(function):
+    """The `return jsonify({... 'user_id': ...})` statement inside the function"""
+    for node in ast.walk(function):
+        if (isinstance(node, ast.Return) and isinstance(node.value, ast.Call)
+                and getattr(node.value.func, 'id', None) == 'jsonify'
+                and node.value.args and isinstance(node.value.args[0], ast.Dict)):
+            keys = [key.value for key in node.value.args[0].keys if isinstance(key, ast.Constant)]
+            if 'user_id' in keys:
+                return node
+    return None
+
+
+source = APP_PATH.read_text(encoding='utf-8')
+tree = ast.parse(source)
+
+function = next((node for node in ast.walk(tree)
+                 if isinstance(node, ast.FunctionDef) and node.name == TARGET_FUNCTION), None)
+if function is None:
+    print(f"Could not find {TARGET_FUNCTION}() in {APP_PATH}")
+    sys.exit(1)
+
+if MARKER in ast.get_source_segment(source, function):
+    print("Auto-load logic is already present, nothing to do")
+    sys.exit(0)
+
+return_node = find_response_return(function)
+if return_node is None:
+    print("Could not find insertion point")
+    sys.exit(1)
+
+print(f"Found insertion point at line {return_node.lineno}")
+
+lines = source.splitlines(keepends=True)
+
+# Add the mailbox info after the last key of the returned dict (positions are 1-based lines,
+# 0-based columns counted in UTF-8 bytes, so the splice is done on the encoded line)
+response_dict = return_node.value.args[0]
+last_value = response_dict.values[-1]
+end_line = lines[last_value.end_lineno - 1].encode('utf-8')
+col = last_value.end_col_offset
+lines[last_value.end_lineno - 1] = (end_line[:col] + response_keys.encode('utf-8') + end_line[col:]).decode('utf-8')
+
+# Insert the auto-load block right before the return statement, one list entry per line
+# (done last, since it shifts every line after it)
+insert_at = return_node.lineno - 1
+lines[insert_at:insert_at] = new_code.splitlines(keepends=True)
+
+# Write back atomically
+tmp_path = APP_PATH.with_suffix('.py.tmp')
+tmp_path.write_text(''.join(lines), encoding='utf-8')
+os.replace(tmp_path, APP_PATH)
 
 print("Successfully inserted auto-load logic")
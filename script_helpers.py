@@ -0,0 +1,39 @@
+"""Helpers shared by the root-level check and test scripts"""
+import importlib.util
+import sys
+from datetime import datetime
+
+# ISO-8601 parser: ciso8601 when installed, else the stdlib (which accepts 'Z' from 3.11)
+try:
+    from ciso8601 import parse_datetime as parse_iso_datetime
+except ImportError:
+    if sys.version_info >= (3, 11):
+        parse_iso_datetime = datetime.fromisoformat
+    else:
+        def parse_iso_datetime(value):
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+# Wire compression: zstd/snappy when their packages are installed, zlib always
+COMPRESSORS = ','.join([name for name, module in (('zstd', 'zstandard'), ('snappy', 'snappy'))
+                        if importlib.util.find_spec(module)] + ['zlib'])
+
+
+def connect_local_mongo(url="mongodb://localhost:27017/"):
+    """Read-only client that fails fast if the local server is down and reads whatever the nearest member has"""
+    import pymongo  # here, so the date helper above works without pymongo installed
+    return pymongo.MongoClient(
+        url,
+        serverSelectionTimeoutMS=2000,
+        connectTimeoutMS=1000,
+        socketTimeoutMS=5000,
+        compressors=COMPRESSORS,
+        readPreference='nearest',
+        readConcernLevel='local',
+    )
+
+
+def raw_view(collection):
+    """Collection whose documents stay as raw BSON until a field is read"""
+    from bson.raw_bson import RawBSONDocument
+    codec_options = collection.codec_options.with_options(document_class=RawBSONDocument)
+    return collection.with_options(codec_options=codec_options)
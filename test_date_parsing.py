@@ -1,10 +1,9 @@
-from datetime import datetime, timezone
+from script_helpers import parse_iso_datetime
 
 def test_parse(date_str):
     print(f"Testing string: '{date_str}'")
     try:
-        # Current logic
-        dt = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        dt = parse_iso_datetime(date_str)
         print(f"✅ Success: {dt}")
     except Exception as e:
         print(f"❌ Failed: {e}")
@@ -1,22 +1,55 @@
 import requests
 import sys
 
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 BASE_URL = "http://localhost:5000"
 
+# Keep-alive session that accepts compressed responses
+session = requests.Session()
+session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+def count_tracking_records(response):
+    """Number of records in the response's 'tracking' array, or None if the field is missing
+
+    With ijson the body is streamed and never materialized; otherwise it is decoded whole.
+    """
+    if ijson is None:
+        data = json_loads(response.content)
+        return len(data['tracking']) if 'tracking' in data else None
+
+    response.raw.decode_content = True  # let urllib3 undo gzip/deflate
+    found = False
+    count = 0
+    for prefix, event, _ in ijson.parse(response.raw):
+        if prefix == 'tracking' and event == 'start_array':
+            found = True
+        elif prefix == 'tracking.item' and event in ('start_map', 'start_array', 'string', 'number', 'boolean', 'null'):
+            count += 1  # one event per item: its opening bracket, or the value itself if scalar
+    return count if found else None
+
 def test_get_email_tracking():
     print("Testing /get-email-tracking endpoint...")
     try:
-        response = requests.get(f"{BASE_URL}/get-email-tracking")
-        if response.status_code == 200:
-            print("✅ /get-email-tracking returned 200 OK")
-            data = response.json()
-            if 'tracking' in data:
-                print(f"✅ Response contains 'tracking' data ({len(data['tracking'])} records)")
+        with session.get(f"{BASE_URL}/get-email-tracking", stream=True) as response:
+            if response.status_code == 200:
+                print("✅ /get-email-tracking returned 200 OK")
+                count = count_tracking_records(response)
+                if count is not None:
+                    print(f"✅ Response contains 'tracking' data ({count} records)")
+                else:
+                    print("❌ Response missing 'tracking' field")
             else:
-                print("❌ Response missing 'tracking' field")
-        else:
-            print(f"❌ /get-email-tracking returned {response.status_code}")
-            print(response.text)
+                print(f"❌ /get-email-tracking returned {response.status_code}")
+                print(response.text[:500])
     except Exception as e:
         print(f"❌ Failed to connect to {BASE_URL}: {e}")
 